@@ -1,6 +1,7 @@
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
+from src.model.partitions import build_partitions, save_partitions
 import os
 
 # Create compact knowledge base for cloud deployment
@@ -17,6 +18,21 @@ documents = [
     Document(page_content="Unsupervised learning finds hidden patterns in unlabeled data without human supervision.", metadata={"category": "UL"}),
 ]
 
+# Prefer a compact index derived from the full corpus index; the hand-written
+# documents above are only a fallback when no full index has been built
+FULL_INDEX = "model/gemini-rag"
+if os.path.exists(os.path.join(FULL_INDEX, "index.faiss")):
+    from pipelines.compact_index_pipeline import CompactIndexPipeline
+    CompactIndexPipeline(
+        full_index_path=FULL_INDEX,
+        output_path="model/gemini-rag-small",
+        budget_mb=float(os.getenv('CLOUD_INDEX_BUDGET_MB', '25')),
+        precision=os.getenv('CLOUD_INDEX_PRECISION', 'fp32'),
+        questions_path="data/processed/validation.csv" if os.path.exists("data/processed/validation.csv") else None,
+    ).run()
+    raise SystemExit(0)
+
+print("⚠️ Full index not found at model/gemini-rag, using the built-in seed documents")
 print("🔄 Creating cloud-optimized vector database...")
 embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
 vector_db = FAISS.from_documents(documents, embeddings)
@@ -26,5 +42,6 @@ os.makedirs("model/gemini-rag-small", exist_ok=True)
 
 # Save to different folder for cloud deployment
 vector_db.save_local("model/gemini-rag-small")
+save_partitions("model/gemini-rag-small", build_partitions([doc.metadata for doc in documents]))
 print("✅ Created cloud vector database at: model/gemini-rag-small/")
 print("📊 Database size: Small & optimized for deployment")
\ No newline at end of file
@@ -0,0 +1,70 @@
+import streamlit as st
+import os
+from src.frontend.chat_app import get_chat_client
+
+# Page configuration
+st.set_page_config(
+    page_title="Chatbot Monitoring",
+    page_icon="📊",
+    layout="wide"
+)
+
+st.markdown("## 📊 Live Monitoring")
+
+# API Configuration
+with st.sidebar:
+    st.header("🔧 Configuration")
+    api_url = st.text_input(
+        "API Server URL",
+        value=os.getenv('RAILWAY_API_URL', "http://127.0.0.1:8000").rstrip('/'),
+        help="FastAPI server exposing /metrics"
+    )
+    window = st.selectbox("Window", ["60s", "300s", "900s"], index=1)
+
+def fetch_metrics(api_url):
+    try:
+        return get_chat_client(api_url).get_json("/metrics"), None
+    except Exception as e:
+        return None, str(e)
+
+def format_ms(seconds):
+    return "–" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+metrics, error = fetch_metrics(api_url)
+if error:
+    st.error(f"❌ Could not load metrics: {error}")
+    st.stop()
+
+recent = metrics['windows'][window]
+lifetime = metrics['lifetime']
+
+# Recent window
+st.markdown(f"### ⏱️ Last {recent['window_seconds']} seconds")
+cols = st.columns(4)
+cols[0].metric("Requests/sec", f"{recent['requests_per_second']:.2f}")
+cols[1].metric("Error rate", f"{recent['error_rate'] * 100:.1f}%")
+cols[2].metric("Cache hit rate", f"{recent['cache_hit_rate'] * 100:.1f}%")
+cols[3].metric("Median prompt", f"{recent['prompt_chars']['p50'] or 0:.0f} chars")
+
+cols = st.columns(4)
+for col, key in zip(cols, ['p50', 'p90', 'p95', 'p99']):
+    col.metric(f"Latency {key}", format_ms(recent['latency'][key]))
+
+# Lifetime
+st.markdown("### 📈 Since startup")
+cols = st.columns(4)
+cols[0].metric("Requests", lifetime['requests'])
+cols[1].metric("Error rate", f"{lifetime['error_rate'] * 100:.1f}%")
+cols[2].metric("Latency p95", format_ms(lifetime['latency']['p95']))
+cols[3].metric("Latency p99", format_ms(lifetime['latency']['p99']))
+
+# Logging pipeline health
+logging_stats = metrics.get('logging', {})
+if logging_stats.get('async_logging'):
+    st.caption(
+        f"📝 Log queue {logging_stats['queue_depth']}/{logging_stats['queue_capacity']}, "
+        f"dropped {logging_stats['dropped']}"
+    )
+
+if st.button("🔄 Refresh"):
+    st.rerun()
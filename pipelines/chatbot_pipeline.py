@@ -2,42 +2,137 @@
 Chatbot Training Pipeline for Gemini RAG System
 """
 from typing import List
+import json
+import re
 import pandas as pd
 import os
 from langchain_classic.text_splitter import RecursiveCharacterTextSplitter
 from langchain_classic.embeddings import HuggingFaceEmbeddings
 from langchain_classic.vectorstores import FAISS
 from langchain_core.documents import Document
+from src.utils.stage_cache import StageCache, EmbeddingCache, hash_file, hash_params
+from src.data_preprocessing.deduplication import (
+    MinHashDeduplicator, SemanticDeduplicator, measure_retrieval_effect, summarize_dedup
+)
+from src.data_preprocessing.chunking import TokenChunker
+from src.model.partitions import PARTITIONS_VERSION, build_partitions, save_partitions
+from src.model.sharded_index import remove_shards, write_shards
 
 class ChatbotTrainingPipeline:
-    def __init__(self, data_path: str, output_path: str = "models/gemini-rag"):
+    # Bump when _create_documents changes what documents contain (v2: extra CSV
+    # columns as metadata), so cached documents/chunks and built indexes are rebuilt
+    DOCUMENTS_VERSION = 2
+
+    def __init__(self, data_path: str, output_path: str = "models/gemini-rag",
+                 chunk_size: int = 1000, chunk_overlap: int = 100,
+                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 use_cache: bool = True, dedup: bool = True,
+                 semantic_dedup_threshold: float = None, dedup_report: bool = False,
+                 token_chunking: bool = True, chunk_tokens: int = 256,
+                 chunk_overlap_tokens: int = 32, embeddings=None, num_shards: int = 1):
         self.data_path = data_path
         self.output_path = output_path
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.embedding_model = embedding_model
+        self.use_cache = use_cache
+        self.stage_cache = StageCache() if use_cache else None
+        self.embedding_cache = EmbeddingCache() if use_cache else None
+        self.minhash_dedup = MinHashDeduplicator() if dedup else None
+        self.semantic_dedup = (
+            SemanticDeduplicator(semantic_dedup_threshold) if semantic_dedup_threshold else None
+        )
+        self.dedup_report = dedup_report
+        # Token-aware chunking measures chunk_tokens with the embedding tokenizer;
+        # otherwise chunk_size/chunk_overlap (characters) are used
+        self.chunker = (
+            TokenChunker(embedding_model, chunk_tokens, chunk_overlap_tokens) if token_chunking else None
+        )
+        self.chunk_stats = None
+        self.dedup_stats = []
+        self._embeddings = embeddings  # Shared embedding model, created lazily when None
+        # Above 1, the index is also written as this many shards for scatter-gather serving
+        self.num_shards = num_shards
+
+    def _stage(self, stage: str, input_hash: str, params: dict, compute):
+        """Run a stage through the content-addressed cache when enabled"""
+        if not self.use_cache:
+            return compute()
+        return self.stage_cache.run(stage, input_hash, params, compute)
+
+    def _split_params(self) -> dict:
+        if self.chunker:
+            return self.chunker.cache_params()
+        return {'chunker': 'chars', 'chunk_size': self.chunk_size, 'chunk_overlap': self.chunk_overlap}
+
+    def _documents_params(self) -> dict:
+        return {'version': self.DOCUMENTS_VERSION, 'metadata': 'extra_columns'}
+
+    def _documents_hash(self, data_hash: str) -> str:
+        """Input hash for stages downstream of document creation"""
+        return hash_params({'data': data_hash, 'documents': self._documents_params()})
+
+    def _index_key(self, data_hash: str) -> str:
+        """Key identifying the index that the current input and settings produce"""
+        key = {
+            'data': data_hash,
+            'documents': self._documents_params(),
+            'split': self._split_params(),
+            'embedding_model': self.embedding_model,
+            'dedup': self._dedup_params(),
+            'partitions': PARTITIONS_VERSION,
+        }
+        if self.num_shards > 1:
+            key['num_shards'] = self.num_shards
+        return hash_params(key)
+
+    def _dedup_params(self) -> dict:
+        return {
+            'minhash': self.minhash_dedup.cache_params() if self.minhash_dedup else None,
+            'semantic': self.semantic_dedup.cache_params() if self.semantic_dedup else None,
+        }
+
+    def _index_is_current(self, index_key: str) -> bool:
+        manifest_path = os.path.join(self.output_path, "build_manifest.json")
+        if not os.path.exists(manifest_path):
+            return False
+        try:
+            with open(manifest_path) as f:
+                return json.load(f).get('index_key') == index_key
+        except Exception:
+            return False
         
     def run_pipeline(self) -> bool:
         """Run complete training pipeline"""
         try:
             print("🚀 Starting Chatbot Training Pipeline...")
+            self.dedup_stats = []
+            data_hash = hash_file(self.data_path)
+            index_key = self._index_key(data_hash)
+            if self.use_cache and self._index_is_current(index_key):
+                print("♻️ Vector database is up to date, nothing to do")
+                return True
             
-            # 1. Load and prepare data
-            print("📊 Loading data...")
-            data = self._load_data()
+            # 1-4. Documents, dedup, chunks and chunk vectors
+            all_documents, documents, chunks, vectors = self.prepare_chunks(data_hash)
             
-            # 2. Create documents
-            print("📝 Creating documents...")
-            documents = self._create_documents(data)
-            
-            # 3. Split into chunks
-            print("✂️ Splitting documents...")
-            chunks = self._split_documents(documents)
-            
-            # 4. Create vector database
+            # 4b. Create vector database
             print("🔧 Creating vector database...")
-            vector_db = self._create_vector_db(chunks)
+            vector_db = self._create_vector_db(chunks, vectors, self._embeddings)
+            if self.dedup_report and (self.minhash_dedup or self.semantic_dedup):
+                self._report_dedup_effect(all_documents, data_hash, chunks, vectors)
             
             # 5. Save vector database
             print("💾 Saving vector database...")
             self._save_vector_db(vector_db)
+            save_partitions(self.output_path, build_partitions([chunk.metadata for chunk in chunks]))
+            if self.num_shards > 1:
+                print(f"🧩 Writing {self.num_shards} index shards...")
+                write_shards(self.output_path, vectors, [c.page_content for c in chunks],
+                             [c.metadata for c in chunks], self.num_shards, self.embedding_model)
+            else:
+                remove_shards(self.output_path)  # RAG_USE_SHARDS=1 must not serve an older build
+            self._write_manifest(index_key, len(documents), len(chunks))
             
             print("✅ Training pipeline completed successfully!")
             return True
@@ -46,42 +141,187 @@ class ChatbotTrainingPipeline:
             print(f"❌ Training pipeline failed: {e}")
             return False
     
+    def prepare_chunks(self, data_hash: str = None):
+        """Build (all documents, deduplicated documents, chunks, chunk vectors).
+        
+        Every step goes through the stage/embedding caches, so pipelines that
+        share data and chunking settings (e.g. the retrieval sweep) reuse them.
+        """
+        data_hash = data_hash or hash_file(self.data_path)
+        documents_hash = self._documents_hash(data_hash)
+        
+        # 1-2. Load data and create documents
+        print("📝 Creating documents...")
+        documents = self._stage(
+            'documents', data_hash, self._documents_params(),
+            lambda: self._create_documents(self._load_data())
+        )
+        
+        # 2b. Drop near-duplicate documents before they reach the index
+        all_documents = documents
+        if self.minhash_dedup:
+            print("🧹 Removing near-duplicate documents...")
+            # Stats are cached with the output so cached runs still report them
+            documents, minhash_stats = self._stage(
+                'dedup', documents_hash, {**self.minhash_dedup.cache_params(), 'with_stats': True},
+                lambda: self._dedup_documents(documents)
+            )
+            self.dedup_stats.append(minhash_stats)
+        
+        # 3. Split into chunks
+        print("✂️ Splitting documents...")
+        split_input = hash_params({'data': documents_hash, 'dedup': self._dedup_params()['minhash']})
+        chunks, self.chunk_stats = self._stage(
+            'split', split_input, self._split_params(),
+            lambda: self._split_documents(documents)
+        )
+        self._report_chunking()
+        
+        # 4. Embed chunks (cached per chunk)
+        print("🔢 Embedding chunks...")
+        _, vectors = self._embed_chunks(chunks)
+        if self.semantic_dedup:
+            chunks, vectors = self._semantic_dedup_chunks(chunks, vectors)
+        return all_documents, documents, chunks, vectors
+    
     def _load_data(self) -> pd.DataFrame:
         """Load conversation data"""
         return pd.read_csv(self.data_path)
     
     def _create_documents(self, df: pd.DataFrame) -> List[Document]:
         """Create LangChain documents from DataFrame"""
+        # Extra columns (e.g. category) become metadata usable as retrieval filters
+        metadata_columns = [c for c in df.columns if c not in ('input', 'response')]
         documents = []
         for _, row in df.iterrows():
+            metadata = {'source': 'conversation_data'}
+            metadata.update({c: row[c] for c in metadata_columns if pd.notna(row[c])})
             doc = Document(
                 page_content=f"Question: {row['input']}\nAnswer: {row['response']}",
-                metadata={'source': 'conversation_data'}
+                metadata=metadata
             )
             documents.append(doc)
         return documents
     
-    def _split_documents(self, documents: List[Document]) -> List[Document]:
-        """Split documents into chunks"""
+    def _dedup_documents(self, documents: List[Document]):
+        """Remove near-duplicate documents with MinHash/LSH"""
+        # Compare on the utterances only; the shared "Question:/Answer:" labels
+        # would otherwise inflate similarity between short pairs
+        texts = [re.sub(r'^(Question|Answer):\s*', '', doc.page_content, flags=re.M)
+                 for doc in documents]
+        keep = self.minhash_dedup.keep_mask(texts)
+        kept = [doc for doc, k in zip(documents, keep) if k]
+        stats = summarize_dedup('minhash', len(documents), len(kept))
+        print(f"🧹 MinHash dedup kept {stats['kept']}/{stats['input']} documents "
+              f"({stats['removed_pct']}% removed)")
+        return kept, stats
+    
+    def _semantic_dedup_chunks(self, chunks: List[Document], vectors: List[List[float]]):
+        """Remove chunks that are near-identical in embedding space"""
+        keep = self.semantic_dedup.keep_mask(vectors)
+        kept_chunks = [c for c, k in zip(chunks, keep) if k]
+        kept_vectors = [v for v, k in zip(vectors, keep) if k]
+        stats = summarize_dedup('semantic', len(chunks), len(kept_chunks))
+        self.dedup_stats.append(stats)
+        print(f"🧹 Semantic dedup kept {stats['kept']}/{stats['input']} chunks "
+              f"({stats['removed_pct']}% removed)")
+        return kept_chunks, kept_vectors
+    
+    def _report_dedup_effect(self, all_documents: List[Document], data_hash: str,
+                             chunks: List[Document], vectors: List[List[float]]):
+        """Compare the deduplicated index against one built from every document"""
+        print("📏 Measuring dedup effect on index size and retrieval...")
+        full_chunks, _ = self._stage(
+            'split', hash_params({'data': self._documents_hash(data_hash), 'dedup': None}), self._split_params(),
+            lambda: self._split_documents(all_documents)
+        )
+        _, full_vectors = self._embed_chunks(full_chunks)
+        effect = measure_retrieval_effect(
+            [c.page_content for c in full_chunks], full_vectors,
+            [c.page_content for c in chunks], vectors
+        )
+        self.dedup_stats.append(summarize_dedup('total', len(full_chunks), len(chunks), effect))
+        print(f"📉 Index shrank {effect['index_shrink_pct']}%, search "
+              f"{effect['before']['avg_search_ms']}ms -> {effect['after']['avg_search_ms']}ms, "
+              f"top-{effect['k']} unique ratio "
+              f"{effect['before']['top_k_unique_ratio']} -> {effect['after']['top_k_unique_ratio']}")
+    
+    def _split_documents(self, documents: List[Document]):
+        """Split documents into chunks; returns (chunks, chunking stats or None)"""
+        if self.chunker:
+            pieces, stats = self.chunker.chunk_texts([doc.page_content for doc in documents])
+            chunks = [Document(page_content=text, metadata=dict(documents[index].metadata))
+                      for index, text in pieces]
+            return chunks, stats
         splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
             length_function=len
         )
-        return splitter.split_documents(documents)
+        return splitter.split_documents(documents), None
     
-    def _create_vector_db(self, chunks: List[Document]) -> FAISS:
-        """Create FAISS vector database"""
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
+    def _report_chunking(self):
+        stats = self.chunk_stats
+        if not stats:
+            return
+        lengths = stats['token_lengths']
+        print(f"✂️ {stats['documents']} documents -> {stats['chunks']} chunks "
+              f"({stats['short_circuited']} short enough to skip tokenizing, "
+              f"{stats['split_documents']} split)")
+        if lengths['count']:
+            print(f"📏 Tokens per chunk: p50 {lengths['p50']:.0f}, p95 {lengths['p95']:.0f}, "
+                  f"max {lengths['max']}; {stats['would_truncate']} documents exceeded the "
+                  f"{self.chunker.max_tokens}-token limit, {stats['truncated_chunks']} chunks still do")
+    
+    def _embed_chunks(self, chunks: List[Document]):
+        """Embed chunk texts, reusing cached vectors when enabled"""
+        if self._embeddings is None:
+            self._embeddings = HuggingFaceEmbeddings(
+                model_name=self.embedding_model
+            )
+        embeddings = self._embeddings
+        texts = [chunk.page_content for chunk in chunks]
+        if self.use_cache:
+            vectors = self.embedding_cache.embed_documents(texts, embeddings, self.embedding_model)
+        else:
+            vectors = embeddings.embed_documents(texts)
+        return embeddings, vectors
+    
+    def _create_vector_db(self, chunks: List[Document], vectors: List[List[float]],
+                          embeddings) -> FAISS:
+        """Create FAISS vector database from precomputed chunk vectors"""
+        texts = [chunk.page_content for chunk in chunks]
+        return FAISS.from_embeddings(
+            list(zip(texts, vectors)),
+            embeddings,
+            metadatas=[chunk.metadata for chunk in chunks]
         )
-        return FAISS.from_documents(chunks, embeddings)
     
     def _save_vector_db(self, vector_db: FAISS):
         """Save vector database"""
         os.makedirs(self.output_path, exist_ok=True)
         vector_db.save_local(self.output_path)
+    
+    def _write_manifest(self, index_key: str, num_documents: int, num_chunks: int):
+        """Record which inputs and settings produced the saved index"""
+        manifest = {
+            'index_key': index_key,
+            'data_path': self.data_path,
+            'chunk_size': self.chunk_size,
+            'chunk_overlap': self.chunk_overlap,
+            'chunking': self._split_params(),
+            'chunk_stats': self.chunk_stats,
+            'embedding_model': self.embedding_model,
+            'num_documents': num_documents,
+            'num_chunks': num_chunks,
+            'num_shards': self.num_shards,
+            'dedup': self._dedup_params(),
+            'dedup_stats': self.dedup_stats,
+        }
+        with open(os.path.join(self.output_path, "build_manifest.json"), 'w') as f:
+            json.dump(manifest, f, indent=2)
 
 if __name__ == "__main__":
-    pipeline = ChatbotTrainingPipeline("data/processed/cleaned_conversations.csv")
+    pipeline = ChatbotTrainingPipeline("data/processed/cleaned_conversations.csv", dedup_report=True,
+                                       num_shards=int(os.getenv('INDEX_SHARDS', '1')))
     success = pipeline.run_pipeline()
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Compact Index Pipeline: derive the cloud index from the full index under a size budget
+"""
+import argparse
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import faiss
+import numpy as np
+import pandas as pd
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
+from src.model.partitions import build_partitions, save_partitions
+from src.utils.retrieval_metrics import first_relevant_rank, retrieval_scores, latency_percentiles
+from src.utils.stage_cache import EmbeddingCache
+
+PRECISIONS = ('fp32', 'fp16', 'sq8')
+BYTES_PER_DIM = {'fp32': 4, 'fp16': 2, 'sq8': 1}
+
+
+class CompactIndexPipeline:
+    def __init__(self, full_index_path: str = "model/gemini-rag",
+                 output_path: str = "model/gemini-rag-small", budget_mb: float = 25,
+                 precision: str = 'fp32', questions_path: str = None,
+                 max_questions: int = 500, k: int = 3,
+                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 seed: int = 0):
+        """
+        Args:
+            full_index_path: Index built by ChatbotTrainingPipeline from the processed corpus
+            output_path: Where the compact index is saved
+            budget_mb: Target size of the saved vectors plus docstore
+            precision: Stored vector precision: fp32, fp16 or sq8 (8-bit scalar quantizer)
+            questions_path: CSV with input/response columns used to measure quality loss
+            max_questions: Evaluate at most this many questions
+            k: Retrieval depth compared between the full and compact index
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {PRECISIONS}")
+        self.full_index_path = Path(full_index_path)
+        self.output_path = Path(output_path)
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.precision = precision
+        self.questions_path = questions_path
+        self.max_questions = max_questions
+        self.k = k
+        self.embedding_model = embedding_model
+        self.seed = seed
+        self.embeddings = HuggingFaceEmbeddings(model_name=embedding_model)
+
+    def run(self) -> Dict:
+        print("🚀 Starting compact index pipeline...")
+
+        # 1. Load the full index, its vectors and documents in index order
+        print(f"📥 Loading full index from {self.full_index_path}...")
+        full_db = FAISS.load_local(str(self.full_index_path), self.embeddings,
+                                   allow_dangerous_deserialization=True)
+        vectors = full_db.index.reconstruct_n(0, full_db.index.ntotal)
+        documents = [full_db.docstore.search(full_db.index_to_docstore_id[i])
+                     for i in range(full_db.index.ntotal)]
+
+        # 2. Work out how many chunks fit the budget
+        target = self._target_count(vectors, documents)
+        print(f"📐 Keeping {target} of {len(documents)} chunks "
+              f"({self.budget_bytes / 1024 / 1024:.1f} MB budget, {self.precision})")
+
+        # 3. Cluster embeddings and keep the chunk nearest each centroid
+        start = time.perf_counter()
+        keep = self._select_representatives(vectors, target)
+        print(f"🧩 Selected {len(keep)} representative chunks in {time.perf_counter() - start:.1f}s")
+
+        # 4. Build and save the compact index
+        compact_db = self._build_index(vectors[keep], [documents[i] for i in keep])
+        os.makedirs(self.output_path, exist_ok=True)
+        compact_db.save_local(str(self.output_path))
+        save_partitions(self.output_path, build_partitions([documents[i].metadata for i in keep]))
+
+        # 5. Report size and retrieval-quality loss versus the full index
+        report = {
+            'full_index': str(self.full_index_path),
+            'full_chunks': len(documents),
+            'compact_chunks': len(keep),
+            'precision': self.precision,
+            'budget_bytes': self.budget_bytes,
+            'full_bytes': self._saved_bytes(self.full_index_path),
+            'compact_bytes': self._saved_bytes(self.output_path),
+        }
+        if self.questions_path:
+            report['quality'] = self._compare_quality(full_db, compact_db)
+        with open(self.output_path / "compact_report.json", 'w') as f:
+            json.dump(report, f, indent=2)
+        self._print_report(report)
+        print("✅ Compact index pipeline completed successfully!")
+        return report
+
+    def _target_count(self, vectors: np.ndarray, documents: List) -> int:
+        """Chunks that fit the budget given per-chunk vector and docstore bytes"""
+        doc_bytes = len(pickle.dumps(documents)) / max(len(documents), 1)
+        per_chunk = vectors.shape[1] * BYTES_PER_DIM[self.precision] + doc_bytes
+        return max(1, min(len(documents), int(self.budget_bytes // per_chunk)))
+
+    def _select_representatives(self, vectors: np.ndarray, target: int) -> List[int]:
+        """Positions of the chunks closest to each k-means centroid"""
+        if target >= len(vectors):
+            return list(range(len(vectors)))
+        kmeans = faiss.Kmeans(vectors.shape[1], target, niter=20, seed=self.seed,
+                              min_points_per_centroid=1, max_points_per_centroid=64)
+        kmeans.train(vectors)
+        # Nearest member of each centroid; a chunk can represent only one cluster
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        _, nearest = index.search(kmeans.centroids, 4)
+        keep = set()
+        for candidates in nearest:
+            chosen = next((int(i) for i in candidates if i >= 0 and int(i) not in keep), None)
+            if chosen is not None:
+                keep.add(chosen)
+        return sorted(keep)
+
+    def _build_index(self, vectors: np.ndarray, documents: List) -> FAISS:
+        dim = vectors.shape[1]
+        if self.precision == 'fp32':
+            index = faiss.IndexFlatL2(dim)
+        else:
+            qtype = faiss.ScalarQuantizer.QT_fp16 if self.precision == 'fp16' else faiss.ScalarQuantizer.QT_8bit
+            index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_L2)
+            index.train(vectors)
+        index.add(vectors)
+        ids = [str(i) for i in range(len(documents))]
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(dict(zip(ids, documents))),
+            index_to_docstore_id=dict(enumerate(ids)),
+        )
+
+    def _compare_quality(self, full_db: FAISS, compact_db: FAISS) -> Dict:
+        """recall@k / MRR and search latency on both indexes, plus top-k overlap"""
+        df = pd.read_csv(self.questions_path, usecols=['input', 'response']).dropna()
+        df = df.head(self.max_questions)
+        queries = EmbeddingCache().embed_documents(list(df['input']), self.embeddings, self.embedding_model)
+        queries = np.asarray(queries, dtype=np.float32)
+        depth = max(self.k, 5)
+
+        results = {}
+        top_texts = {}
+        for name, db in (('full', full_db), ('compact', compact_db)):
+            ranks, latencies, texts = [], [], []
+            for query, expected in zip(queries, df['response']):
+                start = time.perf_counter()
+                _, ids = db.index.search(query.reshape(1, -1), depth)
+                latencies.append(time.perf_counter() - start)
+                docs = [db.docstore.search(db.index_to_docstore_id[int(i)]).page_content
+                        for i in ids[0] if i >= 0]
+                ranks.append(first_relevant_rank(docs, expected))
+                texts.append(set(docs[:self.k]))
+            results[name] = {**retrieval_scores(ranks, (1, self.k, 5)),
+                             'search_latency': latency_percentiles(latencies)}
+            top_texts[name] = texts
+
+        overlap = [len(f & c) / len(f) for f, c in zip(top_texts['full'], top_texts['compact']) if f]
+        results['questions'] = len(df)
+        results[f'top{self.k}_overlap'] = float(np.mean(overlap)) if overlap else 0.0
+        results['loss'] = {metric: results['full'][metric] - results['compact'][metric]
+                           for metric in results['full'] if metric != 'search_latency'}
+        return results
+
+    def _saved_bytes(self, path: Path) -> int:
+        return sum((path / name).stat().st_size for name in ('index.faiss', 'index.pkl'))
+
+    def _print_report(self, report: Dict):
+        print(f"📦 {report['compact_chunks']} chunks, {report['compact_bytes'] / 1024 / 1024:.2f} MB "
+              f"(full: {report['full_chunks']} chunks, {report['full_bytes'] / 1024 / 1024:.2f} MB)")
+        quality = report.get('quality')
+        if quality:
+            for metric, loss in quality['loss'].items():
+                print(f"  {metric:<10} full {quality['full'][metric]:.3f}  "
+                      f"compact {quality['compact'][metric]:.3f}  loss {loss:+.3f}")
+            print(f"  top{self.k} overlap {quality[f'top{self.k}_overlap'] * 100:.1f}%  "
+                  f"p50 search {quality['full']['search_latency']['p50'] * 1000:.2f}ms -> "
+                  f"{quality['compact']['search_latency']['p50'] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a compact index under a size budget")
+    parser.add_argument("--full-index", default="model/gemini-rag")
+    parser.add_argument("--output", default="model/gemini-rag-small")
+    parser.add_argument("--budget-mb", type=float, default=25)
+    parser.add_argument("--precision", choices=PRECISIONS, default='fp32')
+    parser.add_argument("--questions", help="CSV with input/response columns, e.g. data/processed/validation.csv")
+    parser.add_argument("--max-questions", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    CompactIndexPipeline(
+        full_index_path=args.full_index,
+        output_path=args.output,
+        budget_mb=args.budget_mb,
+        precision=args.precision,
+        questions_path=args.questions,
+        max_questions=args.max_questions,
+        k=args.k,
+    ).run()
@@ -1,50 +1,72 @@
 # data_pipeline.py
-from src.data_preprocessing.data_cleaning import PersonaChatProcessor
-from src.data_preprocessing.data_cleaning import PersonaChatProcessor
+"""
+Data Pipeline: collect raw conversation files and clean them into cleaned_conversations.csv
 
-try:
-    import pandas as pd
-    _HAS_PANDAS = True
-except Exception:
-    pd = None
-    _HAS_PANDAS = False
-
-# Download NLTK data first (run this once)
-import nltk
-try:
-    nltk.download('punkt')
-    nltk.download('stopwords') 
-    nltk.download('wordnet')
-    nltk.download('punkt_tab')
-    nltk.download('averaged_perceptron_tagger')
-    print("NLTK data downloaded successfully!")
-except:
-    print("NLTK data already downloaded or download failed")
-
-# Run the pipeline
-processor = PersonaChatProcessor(r'D:\Personalized_Chatbot\data\raw\personality.csv')
-processed_data = processor.process_dataset()
-
-# Ensure output folder exists and write CSV either with pandas or csv
+Files are parsed in parallel and cleaned as they arrive; each finished file is
+appended to the output and checkpointed, so an interrupted run resumes where
+it stopped and an unchanged input is not processed again.
+"""
+import argparse
+import csv
 import os
-os.makedirs('data/processed', exist_ok=True)
-
-if _HAS_PANDAS:
-    df = pd.DataFrame(processed_data)
-    df.to_csv('data/processed/cleaned_conversations.csv', index=False)
-    print(f"✅ Processing complete! Saved {len(df)} conversation pairs.")
-    print(f"Final dataset columns: {df.columns.tolist()}")
-else:
-    # Fallback: write with csv module
-    import csv
-    if processed_data:
-        keys = list(processed_data[0].keys())
-    else:
-        keys = ['input', 'response']
-    out_path = 'data/processed/cleaned_conversations.csv'
-    with open(out_path, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        for row in processed_data:
-            writer.writerow(row)
-    print(f"✅ Processing complete! Saved {len(processed_data)} conversation pairs (csv fallback).")
\ No newline at end of file
+
+from src.data_preprocessing.data_cleaning import PersonaChatProcessor
+from src.data_preprocessing.data_collection import Checkpoint, DataCollector
+
+FIELDS = ['input', 'response']
+
+
+def run(raw_path: str = 'data/raw', output_path: str = 'data/processed/cleaned_conversations.csv',
+        workers: int = None, restart: bool = False) -> dict:
+    processor = PersonaChatProcessor(raw_path)
+    checkpoint = Checkpoint(output_path + '.checkpoint.json', {
+        'raw_path': raw_path,
+        'preprocessor': processor.preprocessor.cache_params(),
+    })
+    if checkpoint.is_stale():
+        print("🔄 Raw files changed since the last run, starting over")
+        restart = True
+    if restart or not os.path.exists(output_path):
+        checkpoint.reset()
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    resuming = checkpoint.output_bytes > 0
+    with open(output_path, 'a+' if resuming else 'w', encoding='utf-8', newline='') as f:
+        if resuming:
+            # Drop rows of a file that was being written when the last run stopped
+            f.truncate(checkpoint.output_bytes)
+            f.seek(0, os.SEEK_END)
+            print(f"♻️ Resuming after {len(checkpoint.state['files'])} finished files")
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction='ignore')
+        if not resuming:
+            writer.writeheader()
+
+        collector = DataCollector(raw_path, workers, checkpoint)
+        rows = 0
+        for raw_file in collector.collect():
+            pairs = processor.process_records(raw_file.records)
+            writer.writerows(pairs)
+            f.flush()
+            rows += len(pairs)
+            checkpoint.mark_done(raw_file.path, len(pairs), os.fstat(f.fileno()).st_size)
+            print(f"📄 {raw_file.path}: {len(raw_file.records)} records -> {len(pairs)} pairs")
+
+    stats = collector.throughput()
+    total_rows = sum(entry['rows'] for entry in checkpoint.state['files'].values())
+    print(f"✅ Processing complete! {stats['files']} files ({stats['skipped']} already done), "
+          f"{rows} new pairs, {total_rows} in {output_path}")
+    print(f"📊 {stats['files_per_second']:.2f} files/s, "
+          f"{stats['bytes_per_second'] / 1024 / 1024:.2f} MB/s in {stats['seconds']:.1f}s")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect and clean raw conversation data")
+    parser.add_argument("--raw", default="data/raw",
+                        help="Directory of CSV/JSON/JSONL files (optionally .gz/.bz2/.xz), or one file")
+    parser.add_argument("--output", default="data/processed/cleaned_conversations.csv")
+    parser.add_argument("--workers", type=int, help="Parsing processes (default: CPU count)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    run(args.raw, args.output, args.workers, args.restart)
@@ -1,58 +1,160 @@
-import pandas as pd
-from src.model.gemini_rag_system import GeminiRAGSystem
+import argparse
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from src.model.gemini_rag_system import GeminiRAGSystem
+from src.utils.retrieval_metrics import first_relevant_rank, retrieval_scores, latency_percentiles
+
+DEFAULT_QUESTIONS = [
+    "What is artificial intelligence?",
+    "Explain machine learning",
+    "What is deep learning?",
+    "How do neural networks work?"
+]
 
 class EvaluationPipeline:
-    def __init__(self):
-        self.chatbot = GeminiRAGSystem()
-        self.test_questions = [
-            "What is artificial intelligence?",
-            "Explain machine learning",
-            "What is deep learning?",
-            "How do neural networks work?"
-        ]
+    def __init__(self, questions_path: str = None, max_questions: int = None,
+                 concurrency: int = 8, k: int = 3, retrieval_only: bool = False,
+                 report_path: str = 'evaluation_report.json', chatbot: GeminiRAGSystem = None):
+        """
+        Args:
+            questions_path: CSV with `input`/`response` columns (e.g. data/processed/validation.csv).
+                Without it the built-in smoke-test questions are used (no retrieval metrics).
+            max_questions: Evaluate only the first N questions
+            concurrency: Maximum number of questions in flight at once
+            k: Retrieval depth for recall@k / MRR (recall is also reported at 1 and 5)
+            retrieval_only: Skip Gemini calls and only evaluate retrieval
+            report_path: Detailed per-question report; aggregate metrics are
+                written next to it as evaluation_metrics.json
+        """
+        self.chatbot = chatbot or GeminiRAGSystem()
+        self.concurrency = concurrency
+        self.k = k
+        self.retrieval_only = retrieval_only
+        self.report_path = Path(report_path)
+        self.metrics_path = self.report_path.with_name('evaluation_metrics.json')
+        self.test_cases = self._load_test_cases(questions_path, max_questions)
+    
+    def _load_test_cases(self, questions_path, max_questions):
+        if not questions_path:
+            cases = [{'question': q, 'expected': None} for q in DEFAULT_QUESTIONS]
+        else:
+            df = pd.read_csv(questions_path, usecols=['input', 'response']).dropna()
+            cases = [{'question': q, 'expected': r} for q, r in zip(df['input'], df['response'])]
+        return cases[:max_questions] if max_questions else cases
+    
+    def _evaluate_one(self, case: dict) -> dict:
+        """Retrieve and (optionally) answer one question with history disabled"""
+        question = case['question']
+        result = {'question': question, 'success': False, 'timings': {}}
+        start = time.perf_counter()
+        try:
+            retrieval_start = time.perf_counter()
+            docs = self.chatbot.retrieve(question, k=max(self.k, 5))
+            result['timings']['retrieval'] = time.perf_counter() - retrieval_start
+            result['sources_used'] = min(len(docs), self.k)
+            if case['expected'] is not None:
+                result['first_relevant_rank'] = first_relevant_rank(
+                    [doc.page_content for doc in docs], case['expected']
+                )
+            
+            if self.retrieval_only:
+                result['success'] = True
+            else:
+                prompt = self.chatbot.build_prompt(question, docs[:self.k], use_history=False)
+                generation_start = time.perf_counter()
+                response = self.chatbot.model.generate_content(prompt)
+                result['timings']['generation'] = time.perf_counter() - generation_start
+                result['answer'] = response.text
+                result['success'] = True
+        except Exception as e:
+            result['answer'] = f"Error: {str(e)}"
+        result['timings']['total'] = time.perf_counter() - start
+        return result
     
     def run_evaluation(self):
         print("🧪 Starting Evaluation Pipeline...")
-        print(f"Testing {len(self.test_questions)} questions\n")
-        results = []
+        print(f"Testing {len(self.test_cases)} questions with concurrency {self.concurrency}\n")
         
-        for i, question in enumerate(self.test_questions, 1):
-            print(f"[{i}/{len(self.test_questions)}] Testing: {question}")
-            try:
-                result = self.chatbot.ask_question(question)
-                results.append({
-                    'question': question,
-                    'answer': result['answer'],
-                    'success': result['success'],
-                    'sources_used': result.get('sources_count', 0)
-                })
-                print(f"✅ {'Success' if result['success'] else 'Failed'}\n")
-            except Exception as e:
-                results.append({
-                    'question': question,
-                    'answer': f"Error: {str(e)}",
-                    'success': False,
-                    'sources_used': 0
-                })
-                print(f"❌ Error: {str(e)}\n")
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = []
+            for i, result in enumerate(executor.map(self._evaluate_one, self.test_cases), 1):
+                results.append(result)
+                if i % 100 == 0 or i == len(self.test_cases):
+                    print(f"[{i}/{len(self.test_cases)}] evaluated")
+        wall_time = time.perf_counter() - wall_start
+        
+        metrics = self._summarize(results, wall_time)
         
         # Save results
         report = {
             'timestamp': datetime.now().isoformat(),
             'results': results,
-            'summary': {
-                'total_questions': len(results),
-                'success_rate': sum(1 for r in results if r['success']) / len(results) * 100
-            }
+            'summary': metrics
         }
-        
-        with open('evaluation_report.json', 'w') as f:
+        with open(self.report_path, 'w') as f:
             json.dump(report, f, indent=2)
         
-        print(f"✅ Evaluation complete! Success rate: {report['summary']['success_rate']:.1f}%")
+        # Aggregates only, stable key order and rounding so runs diff cleanly
+        with open(self.metrics_path, 'w') as f:
+            json.dump(_round_floats(metrics), f, indent=2, sort_keys=True)
+            f.write('\n')
+        
+        print(f"✅ Evaluation complete! Success rate: {metrics['success_rate']:.1f}%")
+        for name, value in metrics.get('retrieval', {}).items():
+            print(f"   {name}: {value:.3f}")
+        print(f"   throughput: {metrics['throughput_qps']:.2f} questions/s")
+        return metrics
+    
+    def _summarize(self, results, wall_time) -> dict:
+        total = len(results)
+        metrics = {
+            'total_questions': total,
+            'success_rate': sum(1 for r in results if r['success']) / total * 100 if total else 0.0,
+            'concurrency': self.concurrency,
+            'retrieval_only': self.retrieval_only,
+            'wall_time_seconds': wall_time,
+            'throughput_qps': total / wall_time if wall_time else 0.0,
+            'latency': {
+                stage: latency_percentiles([r['timings'][stage] for r in results if stage in r['timings']])
+                for stage in ('retrieval', 'generation', 'total')
+            },
+        }
+        ranked = [r for r in results if 'first_relevant_rank' in r]
+        if ranked:
+            metrics['retrieval'] = retrieval_scores(
+                [r['first_relevant_rank'] for r in ranked], ks=sorted({1, self.k, 5})
+            )
+        return metrics
+
+def _round_floats(value, digits: int = 4):
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {k: _round_floats(v, digits) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_round_floats(v, digits) for v in value]
+    return value
 
 if __name__ == "__main__":
-    pipeline = EvaluationPipeline()
-    pipeline.run_evaluation()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency")
+    parser.add_argument("--questions", help="CSV with input/response columns, e.g. data/processed/validation.csv")
+    parser.add_argument("--max-questions", type=int)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--retrieval-only", action="store_true")
+    args = parser.parse_args()
+    
+    pipeline = EvaluationPipeline(
+        questions_path=args.questions,
+        max_questions=args.max_questions,
+        concurrency=args.concurrency,
+        k=args.k,
+        retrieval_only=args.retrieval_only
+    )
+    pipeline.run_evaluation()
@@ -0,0 +1,216 @@
+"""
+Retrieval Sweep: compare chunking settings, index types and k on held-out questions
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import faiss
+import numpy as np
+import pandas as pd
+from langchain_classic.embeddings import HuggingFaceEmbeddings
+from pipelines.chatbot_pipeline import ChatbotTrainingPipeline
+from src.utils.retrieval_metrics import first_relevant_rank, retrieval_scores, latency_percentiles
+from src.utils.stage_cache import EmbeddingCache
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivf', 'sq8')
+
+
+def parse_chunking(spec: str) -> Dict:
+    """"chars:1000:100" (characters) or "tokens:256:32" (embedding tokens)"""
+    kind, size, overlap = spec.split(':')
+    if kind not in ('chars', 'tokens'):
+        raise ValueError(f"Unknown chunking '{spec}'")
+    return {'name': spec, 'kind': kind, 'size': int(size), 'overlap': int(overlap)}
+
+
+def build_index(index_type: str, vectors: np.ndarray):
+    """FAISS index of the given type over the chunk vectors"""
+    n, dim = vectors.shape
+    if index_type == 'flat':
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, 32)
+        index.hnsw.efSearch = 64
+    elif index_type == 'ivf':
+        nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+        index.train(vectors)
+        index.nprobe = min(8, nlist)
+    elif index_type == 'sq8':
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        index.train(vectors)
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'")
+    index.add(vectors)
+    return index
+
+
+def pareto_frontier(rows: List[Dict], quality: str, latency: str = 'p50_ms') -> List[Dict]:
+    """Rows not beaten on both quality (higher) and latency (lower) by another row"""
+    frontier = []
+    for row in sorted(rows, key=lambda r: (r[latency], -r[quality])):
+        if not frontier or row[quality] > frontier[-1][quality]:
+            frontier.append(row)
+    return frontier
+
+
+class RetrievalSweep:
+    def __init__(self, data_path: str = "data/processed/cleaned_conversations.csv",
+                 questions_path: str = "data/processed/validation.csv",
+                 chunkings: List[str] = ("chars:1000:100", "chars:500:50", "tokens:256:32", "tokens:128:16"),
+                 index_types: List[str] = INDEX_TYPES, ks: List[int] = (1, 3, 5),
+                 max_questions: int = 1000, workers: int = 2,
+                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 report_path: str = "retrieval_sweep.json"):
+        """
+        Args:
+            data_path: Corpus the index variants are built from
+            questions_path: Held-out questions (input/response columns)
+            chunkings: Chunking specs, see parse_chunking
+            index_types: Subset of flat, hnsw, ivf, sq8
+            ks: Retrieval depths to score
+            workers: Chunking configs prepared (chunked and embedded) in parallel;
+                indexes are built and searched one at a time so latencies are comparable
+        """
+        self.data_path = data_path
+        self.questions_path = questions_path
+        self.chunkings = [parse_chunking(spec) for spec in chunkings]
+        self.index_types = list(index_types)
+        self.ks = sorted(ks)
+        self.max_questions = max_questions
+        self.workers = workers
+        self.embedding_model = embedding_model
+        self.report_path = report_path
+        self.embeddings = HuggingFaceEmbeddings(model_name=embedding_model)
+
+    def _prepare(self, chunking: Dict) -> Tuple[List[str], np.ndarray, float]:
+        """Chunk texts and vectors for one chunking config (stage/embedding caches shared)"""
+        pipeline = ChatbotTrainingPipeline(
+            self.data_path,
+            chunk_size=chunking['size'], chunk_overlap=chunking['overlap'],
+            token_chunking=chunking['kind'] == 'tokens',
+            chunk_tokens=chunking['size'], chunk_overlap_tokens=chunking['overlap'],
+            embedding_model=self.embedding_model, embeddings=self.embeddings,
+        )
+        start = time.perf_counter()
+        _, _, chunks, vectors = pipeline.prepare_chunks()
+        return ([c.page_content for c in chunks], np.asarray(vectors, dtype=np.float32),
+                time.perf_counter() - start)
+
+    def _evaluate(self, index, texts: List[str], queries: np.ndarray, expected: List[str]) -> Dict:
+        depth = max(self.ks)
+        ranks, latencies = [], []
+        for query, answer in zip(queries, expected):
+            start = time.perf_counter()
+            _, ids = index.search(query.reshape(1, -1), depth)
+            latencies.append(time.perf_counter() - start)
+            ranks.append(first_relevant_rank([texts[i] for i in ids[0] if i >= 0], answer))
+        return {'scores': retrieval_scores(ranks, self.ks), 'latency': latency_percentiles(latencies)}
+
+    def _sweep_chunking(self, chunking: Dict, prepared: Tuple[List[str], np.ndarray, float],
+                        queries: np.ndarray, expected: List[str]) -> List[Dict]:
+        texts, vectors, prepare_seconds = prepared
+        rows = []
+        for index_type in self.index_types:
+            start = time.perf_counter()
+            index = build_index(index_type, vectors)
+            build_seconds = time.perf_counter() - start
+            result = self._evaluate(index, texts, queries, expected)
+            memory = faiss.serialize_index(index).nbytes + sum(len(t.encode()) for t in texts)
+            for k in self.ks:
+                rows.append({
+                    'chunking': chunking['name'],
+                    'index': index_type,
+                    'k': k,
+                    'chunks': len(texts),
+                    'recall@k': result['scores'][f'recall@{k}'],
+                    'mrr': result['scores']['mrr'],
+                    'p50_ms': result['latency']['p50'] * 1000,
+                    'p95_ms': result['latency']['p95'] * 1000,
+                    'memory_mb': memory / 1024 / 1024,
+                    'build_seconds': prepare_seconds + build_seconds,
+                })
+            print(f"📐 {chunking['name']} / {index_type}: {len(texts)} chunks, "
+                  f"recall@{self.ks[-1]} {result['scores'][f'recall@{self.ks[-1]}']:.3f}, "
+                  f"p50 {result['latency']['p50'] * 1000:.2f}ms")
+        return rows
+
+    def run(self) -> Dict:
+        print("🚀 Starting retrieval sweep...")
+        df = pd.read_csv(self.questions_path, usecols=['input', 'response']).dropna().head(self.max_questions)
+        queries = np.asarray(
+            EmbeddingCache().embed_documents(list(df['input']), self.embeddings, self.embedding_model),
+            dtype=np.float32
+        )
+        expected = list(df['response'])
+        print(f"❓ {len(expected)} held-out questions, {len(self.chunkings)} chunkings x "
+              f"{len(self.index_types)} index types x k in {self.ks}")
+
+        # The first config runs alone so the stages every config shares (documents,
+        # dedup) are computed once and cached before the others start
+        prepared = [self._prepare(self.chunkings[0])]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            prepared += list(executor.map(self._prepare, self.chunkings[1:]))
+        # Build and search serially so no config is timed while others use the cores
+        rows = [row for chunking, chunk_data in zip(self.chunkings, prepared)
+                for row in self._sweep_chunking(chunking, chunk_data, queries, expected)]
+
+        # Search latency doesn't depend on k, so compare configurations per k
+        frontier = {k: pareto_frontier([r for r in rows if r['k'] == k], 'recall@k') for k in self.ks}
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'data_path': self.data_path,
+            'questions': len(expected),
+            'rows': rows,
+            'pareto_frontier': frontier,
+        }
+        with open(self.report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print_table(rows, frontier)
+        print(f"💾 Sweep report saved to {self.report_path}")
+        return report
+
+
+def print_table(rows: List[Dict], frontier: Dict[int, List[Dict]]):
+    on_frontier = {id(r) for k_rows in frontier.values() for r in k_rows}
+    print(f"\n{'chunking':<16} {'index':<6} {'k':>2} {'chunks':>7} {'recall':>7} {'mrr':>6} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'MB':>7}")
+    for r in sorted(rows, key=lambda r: (r['k'], -r['recall@k'], r['p50_ms'])):
+        marker = ' ⭐' if id(r) in on_frontier else ''
+        print(f"{r['chunking']:<16} {r['index']:<6} {r['k']:>2} {r['chunks']:>7} {r['recall@k']:>7.3f} "
+              f"{r['mrr']:>6.3f} {r['p50_ms']:>7.3f} {r['p95_ms']:>7.3f} {r['memory_mb']:>7.1f}{marker}")
+    for k, k_rows in frontier.items():
+        print(f"\n⭐ Pareto frontier for k={k} (recall@{k} vs p50 search latency):")
+        for r in k_rows:
+            print(f"   {r['chunking']} / {r['index']}: recall {r['recall@k']:.3f}, "
+                  f"p50 {r['p50_ms']:.3f}ms, {r['memory_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep chunking, index type and k for retrieval")
+    parser.add_argument("--data", default="data/processed/cleaned_conversations.csv")
+    parser.add_argument("--questions", default="data/processed/validation.csv")
+    parser.add_argument("--chunking", nargs='+',
+                        default=["chars:1000:100", "chars:500:50", "tokens:256:32", "tokens:128:16"],
+                        help="chars:<size>:<overlap> or tokens:<size>:<overlap>")
+    parser.add_argument("--index-types", nargs='+', choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--k", nargs='+', type=int, default=[1, 3, 5])
+    parser.add_argument("--max-questions", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--output", default="retrieval_sweep.json")
+    args = parser.parse_args()
+
+    RetrievalSweep(
+        data_path=args.data,
+        questions_path=args.questions,
+        chunkings=args.chunking,
+        index_types=args.index_types,
+        ks=args.k,
+        max_questions=args.max_questions,
+        workers=args.workers,
+        report_path=args.output,
+    ).run()
@@ -0,0 +1,184 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from src.MLOps.monitoring.sketches import LogHistogram
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused; carries the HTTP status and Retry-After seconds"""
+
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class ClientRateLimiter:
+    """Per-client token buckets, keeping at most max_clients buckets (LRU).
+
+    Clients are identified by network address, never by a header the client
+    chooses. Behind ``trusted_proxies`` reverse proxies, the address is the
+    X-Forwarded-For entry appended by the outermost trusted proxy; entries
+    to its left are client-controlled and ignored.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000, trusted_proxies: int = 0):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.trusted_proxies = trusted_proxies
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "ClientRateLimiter":
+        """Disabled unless CHAT_RATE_LIMIT_RPS is set"""
+        return cls(
+            rate=float(os.getenv('CHAT_RATE_LIMIT_RPS') or 0),
+            burst=float(os.getenv('CHAT_RATE_LIMIT_BURST', '10')),
+            trusted_proxies=int(os.getenv('TRUSTED_PROXY_HOPS', '0')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def client_id(self, peer: Optional[str], forwarded_for: Optional[str] = None) -> str:
+        if self.trusted_proxies > 0 and forwarded_for:
+            hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+            if len(hops) >= self.trusted_proxies:
+                return hops[-self.trusted_proxies]
+        return peer or 'unknown'
+
+    def check(self, client_id: str):
+        if not self.enabled:
+            return
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self._buckets[client_id] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        allowed, retry_after = bucket.try_acquire()
+        if not allowed:
+            self.rejected += 1
+            raise AdmissionRejected(429, retry_after, "Rate limit exceeded")
+
+
+class AdmissionController:
+    """Bounded queue in front of the LLM with a concurrency cap and deadline-aware rejection.
+
+    At most ``max_concurrency`` requests run at once and at most ``max_queue``
+    wait. A request is refused immediately (503 + Retry-After) when the queue
+    is full or when it would have to queue and the expected wait already
+    exceeds its deadline, so admitted requests keep a flat latency under
+    overload instead of timing out. With a free slot a request is always
+    admitted, so the service time estimate recovers after slow requests.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 32,
+                 default_deadline: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.default_deadline = default_deadline
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.service_time = None  # EWMA of time spent holding a slot
+        self.wait_times = LogHistogram()
+        self.counters = {'admitted': 0, 'rejected_queue_full': 0, 'rejected_deadline': 0}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_concurrency=int(os.getenv('CHAT_MAX_CONCURRENCY', '8')),
+            max_queue=int(os.getenv('CHAT_MAX_QUEUE', '32')),
+            default_deadline=float(os.getenv('CHAT_DEADLINE_SECONDS', '30')),
+        )
+
+    def _expected_wait(self) -> float:
+        if self.service_time is None or self.running < self.max_concurrency:
+            return 0.0
+        return (self.waiting + 1) / self.max_concurrency * self.service_time
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None):
+        """Hold one LLM slot for the duration of the block, or raise AdmissionRejected"""
+        budget = deadline or self.default_deadline
+        if self.waiting >= self.max_queue:
+            self.counters['rejected_queue_full'] += 1
+            raise AdmissionRejected(503, self._expected_wait() or 1.0, "Server busy, queue is full")
+        expected = self._expected_wait()
+        queued = self.running >= self.max_concurrency
+        if queued and self.service_time is not None and expected + self.service_time > budget:
+            self.counters['rejected_deadline'] += 1
+            raise AdmissionRejected(503, expected, "Server busy, deadline cannot be met")
+
+        enqueued = time.perf_counter()
+        if not self._semaphore.locked():
+            # Free slot: acquire() returns without suspending
+            await self._semaphore.acquire()
+        else:
+            self.waiting += 1
+            try:
+                # Leave time to be served after getting the slot
+                timeout = max(0.0, budget - (self.service_time or 0.0))
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=timeout)
+            except asyncio.TimeoutError:
+                self.counters['rejected_deadline'] += 1
+                raise AdmissionRejected(503, self._expected_wait() or 1.0, "Server busy, deadline exceeded in queue")
+            finally:
+                self.waiting -= 1
+        self.wait_times.add(time.perf_counter() - enqueued)
+
+        self.counters['admitted'] += 1
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Capped so one outlier (e.g. a cold start) can't dominate the estimate
+            elapsed = min(time.perf_counter() - started, self.default_deadline)
+            self.service_time = elapsed if self.service_time is None else 0.8 * self.service_time + 0.2 * elapsed
+            self.running -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'running': self.running,
+            'queue_depth': self.waiting,
+            'service_time_ewma': self.service_time,
+            'queue_wait': self.wait_times.summary(),
+            **self.counters,
+        }
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import uvicorn
 import os
@@ -6,6 +7,7 @@ import sys
 import traceback
 import logging
 from pathlib import Path
+from typing import Dict, List, Optional, Union
 
 # Simple path setup
 current_dir = Path(__file__).parent
@@ -19,7 +21,7 @@ logger = logging.getLogger(__name__)
 # Import GeminiRAGSystem - FROM YOUR STRUCTURE
 try:
     # Your gemini_rag_system.py is at: src/model/gemini_rag_system.py
-    from src.model.gemini_rag_system import GeminiRAGSystem
+    from src.model.gemini_rag_system import GeminiRAGSystem, create_embeddings
     logger.info("✅ Imported GeminiRAGSystem from src.model")
 except ImportError as e:
     logger.error(f"❌ Import failed: {e}")
@@ -31,11 +33,34 @@ except ImportError as e:
         module = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(module)
         GeminiRAGSystem = module.GeminiRAGSystem
+        create_embeddings = module.create_embeddings
         logger.info("✅ Imported GeminiRAGSystem via manual import")
     else:
         logger.error(f"❌ File not found: {gemini_system_path}")
         raise
 
+from src.MLOps.monitoring.model_monitor import ModelMonitor
+
+def create_monitor():
+    """Background-logging monitor; MLflow batching is enabled only when configured"""
+    tracker = None
+    if os.getenv('MLFLOW_TRACKING_URI'):
+        try:
+            from src.MLOps.mlflow_tracking import MLflowTracker
+            tracker = MLflowTracker()
+        except Exception as e:
+            logger.warning(f"⚠️ MLflow tracking disabled: {e}")
+    return ModelMonitor(
+        log_file=os.getenv('CHAT_LOG_FILE', 'monitoring/logs/chat_logs.jsonl'),
+        mlflow_tracker=tracker,
+        max_queue=int(os.getenv('CHAT_LOG_QUEUE_SIZE', '10000')),
+    )
+
+from src.MLOps.api.admission import AdmissionController, AdmissionRejected, ClientRateLimiter
+from src.MLOps.api.sessions import SessionStore
+from src.MLOps.api.diagnostics import Diagnostics, router as diagnostics_router
+from src.model.index_registry import IndexRegistry
+
 # Check if we're in cloud environment
 def is_cloud_environment():
     """Detect if running on cloud platform"""
@@ -52,17 +77,39 @@ app = FastAPI(
     description="AI Chatbot with RAG capabilities",
     version="1.0.0"
 )
+app.monitor = create_monitor()
+app.admission = AdmissionController.from_env()
+app.sessions = SessionStore()
+# Admin-only profiling/memory endpoints, inert unless ADMIN_TOKEN is set
+app.diagnostics = Diagnostics.from_env()
+app.include_router(diagnostics_router)
+# Named indexes share one embedding model; loaded lazily, evicted under RAG_INDEX_MEMORY_MB
+app.registry = IndexRegistry.from_env(
+    GeminiRAGSystem, create_embeddings, use_small_model=is_cloud_environment()
+)
+# Per-client limit, off unless CHAT_RATE_LIMIT_RPS is set (TRUSTED_PROXY_HOPS behind a proxy)
+app.rate_limiter = ClientRateLimiter.from_env()
+
+@app.on_event("shutdown")
+def flush_monitor():
+    app.monitor.close()
+    app.registry.close()  # Stops shard worker processes of sharded indexes
 
 # Request/Response models
 class ChatRequest(BaseModel):
     message: str
     use_history: bool = True
+    deadline_ms: Optional[int] = None  # Give up (503) if the answer can't start in time
+    session_id: Optional[str] = None  # Per-session history kept by the API
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None  # e.g. {"category": "ML"}
+    index: Optional[str] = None  # Named index to answer from; the default index when omitted
 
 class ChatResponse(BaseModel):
     success: bool
     answer: str
     sources_count: int
     response_time: float
+    route: Optional[str] = None  # template, chat (no retrieval) or rag
 
 @app.get("/")
 async def root():
@@ -73,36 +120,73 @@ async def health_check():
     return {"status": "healthy", "service": "chatbot-api"}
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """
     Chat with the Gemini RAG chatbot
     """
     import time
     start_time = time.time()
     
+    if request.index and request.index not in app.registry.indexes:
+        raise HTTPException(status_code=404, detail=f"Unknown index '{request.index}'")
+    
+    # Shed excess load up front: per-client token bucket first, then the LLM queue
+    client_id = app.rate_limiter.client_id(
+        http_request.client.host if http_request.client else None,
+        http_request.headers.get('X-Forwarded-For')
+    )
+    try:
+        app.rate_limiter.check(client_id)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.reason, headers=e.headers())
+    deadline = request.deadline_ms / 1000 if request.deadline_ms else None
+    
     try:
-        # Initialize chatbot once on first request
-        if not hasattr(app, 'chatbot'):
-            logger.info("Initializing Gemini RAG System...")
-            use_small = is_cloud_environment()
-            app.chatbot = GeminiRAGSystem(use_small_model=use_small)
-            logger.info("✅ Gemini RAG System initialized!")
+        # Indexes load on first request that needs them, before taking an LLM slot
+        # so a cold start doesn't count towards the service time estimate
+        chatbot = await run_in_threadpool(app.registry.get, request.index)
         
-        # Process the request
-        result = app.chatbot.ask_question(request.message, request.use_history)
+        async with app.admission.slot(deadline):
+            # Sessions get their own history instead of the shared one
+            history = None
+            if request.session_id:
+                history = app.sessions.recent_exchanges(request.session_id) if request.use_history else []
+            
+            # Process the request
+            # Run the blocking RAG call off the event loop so requests overlap
+            result = await run_in_threadpool(
+                app.diagnostics.wrap(chatbot.ask_question), request.message, request.use_history, history,
+                request.filters
+            )
         response_time = time.time() - start_time
+        app.monitor.log_interaction(request.message, result, response_time)
+        
+        if request.session_id and result['success']:
+            app.sessions.append(request.session_id, 'user', request.message)
+            app.sessions.append(
+                request.session_id, 'assistant', result['answer'],
+                sources=result.get('sources_count', 0)
+            )
         
         return ChatResponse(
             success=result['success'],
             answer=result['answer'],
             sources_count=result.get('sources_count', 0),
-            response_time=response_time
+            response_time=response_time,
+            route=result.get('route')
         )
         
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.reason, headers=e.headers())
     except Exception as e:
         response_time = time.time() - start_time
         logger.error(f"Error in chat endpoint: {str(e)}")
         logger.error(traceback.format_exc())
+        app.monitor.log_interaction(
+            request.message,
+            {'success': False, 'answer': f"Error: {str(e)}", 'sources_count': 0},
+            response_time
+        )
         
         return ChatResponse(
             success=False,
@@ -111,14 +195,55 @@ async def chat_endpoint(request: ChatRequest):
             response_time=response_time
         )
 
+@app.get("/metrics")
+async def live_metrics():
+    """Live latency percentiles and sliding-window rates for the monitoring page"""
+    snapshot = app.monitor.live_snapshot()
+    snapshot['logging'] = app.monitor.logging_stats()
+    snapshot['admission'] = app.admission.stats()
+    snapshot['admission']['rate_limited'] = app.rate_limiter.rejected
+    snapshot['indexes'] = app.registry.stats()
+    chatbot = app.registry.peek()
+    if chatbot is not None:
+        snapshot['coalescing'] = chatbot.single_flight.stats()
+        snapshot['routing'] = chatbot.router.stats()
+        if chatbot.cache is not None:
+            snapshot['cache'] = chatbot.cache.stats()
+        if chatbot.sharded_index is not None:
+            snapshot['shards'] = chatbot.sharded_index.stats()
+    return snapshot
+
+@app.get("/indexes")
+async def list_indexes():
+    """Registered indexes, which are loaded, and their estimated sizes"""
+    return app.registry.stats()
+
+@app.get("/monitoring/logging")
+async def logging_stats():
+    """Background log writer counters (queue depth, dropped entries, ...)"""
+    return app.monitor.logging_stats()
+
+@app.get("/monitoring/report")
+async def monitoring_report(window: str = "day"):
+    """Aggregated metrics over the last hour/day/week"""
+    try:
+        return app.monitor.report(window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/conversation/history")
-async def get_conversation_history():
-    """Get current conversation history"""
+async def get_conversation_history(session_id: Optional[str] = None, before: Optional[int] = None,
+                                   limit: int = 20):
+    """Get current conversation history; with session_id, one page of that session's messages"""
     try:
-        if hasattr(app, 'chatbot'):
+        if session_id:
+            return app.sessions.page(session_id, before, min(limit, 100))
+        chatbot = app.registry.peek()
+        if chatbot is not None:
+            history = chatbot.history()
             return {
-                "history": app.chatbot.conversation_history,
-                "total_turns": len(app.chatbot.conversation_history)
+                "history": history,
+                "total_turns": len(history)
             }
         else:
             return {"history": [], "total_turns": 0}
@@ -126,11 +251,15 @@ async def get_conversation_history():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/conversation/clear")
-async def clear_conversation_history():
+async def clear_conversation_history(session_id: Optional[str] = None):
     """Clear conversation history"""
     try:
-        if hasattr(app, 'chatbot'):
-            app.chatbot.conversation_history.clear()
+        if session_id:
+            app.sessions.clear(session_id)
+            return {"message": "Conversation history cleared"}
+        chatbot = app.registry.peek()
+        if chatbot is not None:
+            chatbot.clear_history()
             return {"message": "Conversation history cleared"}
         else:
             return {"message": "No chatbot instance found"}
@@ -0,0 +1,302 @@
+"""
+Admin-only profiling and memory diagnostics for the chat API.
+
+Disabled unless ADMIN_TOKEN is set; every endpoint then requires the
+X-Admin-Token header. Nothing is instrumented until a capture is requested:
+outside a capture, /chat pays for a single attribute check.
+
+- POST /admin/diagnostics/profile?seconds=30&mode=cprofile
+    cProfile of the /chat calls that run during the window, as a .pstats file
+    (open with snakeviz or ``python -m pstats``), or text with format=text
+- POST /admin/diagnostics/profile?seconds=30&mode=sampling
+    stacks of threads serving /chat sampled every ``interval_ms``, in folded
+    format ("frame;frame;frame count") for flamegraph.pl or speedscope
+- POST /admin/diagnostics/memory/start, GET /admin/diagnostics/memory,
+  POST /admin/diagnostics/memory/stop
+    tracemalloc top allocators and growth since tracing started
+    (DIAGNOSTICS_TRACEMALLOC=1 starts tracing at startup)
+"""
+import asyncio
+import cProfile
+import hmac
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response
+
+MAX_CAPTURE_SECONDS = 300
+
+
+class SamplingProfiler:
+    """Samples the stacks of registered threads from a background thread"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.threads = set()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Diagnostics:
+    def __init__(self, admin_token: Optional[str] = None, trace_at_startup: bool = False,
+                 tracemalloc_frames: int = 10):
+        self.admin_token = admin_token
+        self.tracemalloc_frames = tracemalloc_frames
+        self._lock = threading.Lock()
+        self._profile_stats: Optional[pstats.Stats] = None
+        self._sampler: Optional[SamplingProfiler] = None
+        self.mode: Optional[str] = None  # Capture in progress, if any
+        self.profiled_calls = 0
+        self._baseline = None
+        self._baseline_time = None
+        if admin_token and trace_at_startup:
+            self.start_tracing()
+
+    @classmethod
+    def from_env(cls) -> "Diagnostics":
+        return cls(
+            admin_token=os.getenv('ADMIN_TOKEN') or None,
+            trace_at_startup=os.getenv('DIAGNOSTICS_TRACEMALLOC') == '1',
+            tracemalloc_frames=int(os.getenv('DIAGNOSTICS_TRACEMALLOC_FRAMES', '10')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.admin_token)
+
+    def authorize(self, token: Optional[str]):
+        # Unknown-endpoint response when disabled, so the feature is not advertised
+        if not self.enabled:
+            raise HTTPException(status_code=404, detail="Not Found")
+        if not token or not hmac.compare_digest(token, self.admin_token):
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+
+    # --- profiling ---
+
+    def wrap(self, fn: Callable) -> Callable:
+        """Return fn unchanged unless a capture is running"""
+        if self.mode is None:
+            return fn
+
+        @wraps(fn)
+        def profiled(*args, **kwargs):
+            mode = self.mode
+            if mode == 'cprofile':
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Python 3.12+: one profiler per process, another call holds it
+                    return fn(*args, **kwargs)
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    profile.disable()
+                    with self._lock:
+                        self.profiled_calls += 1
+                        if self._profile_stats is None:
+                            self._profile_stats = pstats.Stats(profile)
+                        else:
+                            self._profile_stats.add(profile)
+            sampler = self._sampler
+            if mode != 'sampling' or sampler is None:
+                return fn(*args, **kwargs)
+            ident = threading.get_ident()
+            sampler.threads.add(ident)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                sampler.threads.discard(ident)
+                with self._lock:
+                    self.profiled_calls += 1
+
+        return profiled
+
+    async def capture(self, seconds: float, mode: str, interval: float = 0.005):
+        """Profile /chat calls for ``seconds``; returns pstats.Stats or SamplingProfiler"""
+        with self._lock:
+            if self.mode is not None:
+                raise HTTPException(status_code=409, detail=f"A {self.mode} capture is already running")
+            self.mode = mode
+            self.profiled_calls = 0
+            self._profile_stats = None
+            if mode == 'sampling':
+                self._sampler = SamplingProfiler(interval)
+                self._sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            with self._lock:
+                self.mode = None
+                sampler, self._sampler = self._sampler, None
+            if sampler:
+                sampler.stop()
+        return sampler if mode == 'sampling' else self._profile_stats
+
+    # --- memory ---
+
+    def start_tracing(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        self._baseline = tracemalloc.take_snapshot()
+        self._baseline_time = time.time()
+
+    def stop_tracing(self):
+        tracemalloc.stop()
+        self._baseline = None
+        self._baseline_time = None
+
+    def memory_report(self, top: int = 25, key_type: str = 'lineno') -> Dict:
+        report = {'rss_bytes': _rss_bytes(), 'tracing': tracemalloc.is_tracing()}
+        if not tracemalloc.is_tracing():
+            return report
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        report.update({
+            'traced_current_bytes': current,
+            'traced_peak_bytes': peak,
+            'tracing_since': self._baseline_time,
+            'top_allocators': [_stat_dict(stat) for stat in snapshot.statistics(key_type)[:top]],
+        })
+        if self._baseline is not None:
+            growth = snapshot.compare_to(self._baseline, key_type)
+            report['growth_since_start'] = [_stat_dict(stat) for stat in growth[:top] if stat.size_diff]
+        return report
+
+
+def _pstats_text(stats: pstats.Stats, top: int) -> str:
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats('cumulative').print_stats(top)
+    return out.getvalue()
+
+
+def _pstats_bytes(stats: pstats.Stats) -> bytes:
+    """Same bytes as Stats.dump_stats writes, without a temporary file"""
+    return marshal.dumps(stats.stats)
+
+
+def _stat_dict(stat) -> Dict:
+    frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    entry = {'location': frames[0] if frames else '?', 'size_bytes': stat.size, 'count': stat.count}
+    if hasattr(stat, 'size_diff'):
+        entry.update({'size_diff_bytes': stat.size_diff, 'count_diff': stat.count_diff})
+    if len(frames) > 1:
+        entry['traceback'] = frames
+    return entry
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == 'darwin' else usage * 1024
+    except ImportError:
+        return None
+
+
+router = APIRouter(prefix="/admin/diagnostics", include_in_schema=False)
+
+
+@router.post("/profile")
+async def profile(request: Request, seconds: float = 30, mode: str = "cprofile",
+                  format: str = "pstats", interval_ms: float = 5, top: int = 50,
+                  x_admin_token: Optional[str] = Header(None)):
+    """Profile live /chat traffic for a time box and return the result"""
+    diagnostics = request.app.diagnostics
+    diagnostics.authorize(x_admin_token)
+    if mode not in ('cprofile', 'sampling'):
+        raise HTTPException(status_code=400, detail="mode must be 'cprofile' or 'sampling'")
+    seconds = max(0.1, min(seconds, MAX_CAPTURE_SECONDS))
+    result = await diagnostics.capture(seconds, mode, interval_ms / 1000)
+    headers = {'X-Profiled-Calls': str(diagnostics.profiled_calls)}
+
+    if mode == 'sampling':
+        headers['Content-Disposition'] = 'attachment; filename="chat_profile.folded"'
+        return PlainTextResponse(await run_in_threadpool(result.folded), headers=headers)
+
+    if result is None:
+        return PlainTextResponse("No /chat calls during the capture window\n", headers=headers)
+    # Formatting large profiles takes a while; keep it off the event loop serving /chat
+    if format == 'text':
+        return PlainTextResponse(await run_in_threadpool(_pstats_text, result, top), headers=headers)
+    data = await run_in_threadpool(_pstats_bytes, result)
+    headers['Content-Disposition'] = 'attachment; filename="chat_profile.pstats"'
+    return Response(data, media_type='application/octet-stream', headers=headers)
+
+
+@router.post("/memory/start")
+async def memory_start(request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Start tracemalloc (if needed) and reset the growth baseline"""
+    request.app.diagnostics.authorize(x_admin_token)
+    # The baseline snapshot walks every traced allocation
+    await run_in_threadpool(request.app.diagnostics.start_tracing)
+    return {'tracing': True}
+
+
+@router.post("/memory/stop")
+async def memory_stop(request: Request, x_admin_token: Optional[str] = Header(None)):
+    request.app.diagnostics.authorize(x_admin_token)
+    request.app.diagnostics.stop_tracing()
+    return {'tracing': False}
+
+
+@router.get("/memory")
+async def memory(request: Request, top: int = 25, key: str = "lineno",
+                 x_admin_token: Optional[str] = Header(None)):
+    """RSS, top tracemalloc allocators and growth since tracing started"""
+    request.app.diagnostics.authorize(x_admin_token)
+    if key not in ('lineno', 'filename', 'traceback'):
+        raise HTTPException(status_code=400, detail="key must be lineno, filename or traceback")
+    # Snapshots and comparisons can take seconds on a large heap; keep them off the event loop
+    return await run_in_threadpool(request.app.diagnostics.memory_report, min(top, 200), key)
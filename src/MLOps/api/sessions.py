@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class SessionStore:
+    """Per-session chat transcripts held by the API.
+
+    Keeps at most ``max_messages`` per session and ``max_sessions`` sessions
+    (least recently used are evicted). Messages keep their absolute index in
+    the transcript so clients can page backwards with ``before``.
+    """
+
+    def __init__(self, max_sessions: int = 10000, max_messages: int = 1000):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def _session(self, session_id: str) -> Dict:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = {'offset': 0, 'messages': []}
+            self._sessions[session_id] = session
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def append(self, session_id: str, role: str, content: str, **extra) -> int:
+        """Append a message and return its absolute index"""
+        with self._lock:
+            session = self._session(session_id)
+            index = session['offset'] + len(session['messages'])
+            session['messages'].append({
+                'index': index, 'role': role, 'content': content,
+                'timestamp': time.time(), **extra
+            })
+            overflow = len(session['messages']) - self.max_messages
+            if overflow > 0:
+                del session['messages'][:overflow]
+                session['offset'] += overflow
+            return index
+
+    def page(self, session_id: str, before: Optional[int] = None, limit: int = 20) -> Dict:
+        """Up to ``limit`` messages older than absolute index ``before`` (newest page by default)"""
+        with self._lock:
+            session = self._sessions.get(session_id, {'offset': 0, 'messages': []})
+            offset, messages = session['offset'], session['messages']
+            total = offset + len(messages)
+            end = total if before is None else max(offset, min(before, total))
+            start = max(offset, end - limit)
+            page = [dict(m) for m in messages[start - offset:end - offset]]
+        return {
+            'messages': page,
+            'total': total,
+            'has_older': start > offset,
+            'next_before': start if start > offset else None,
+        }
+
+    def recent_exchanges(self, session_id: str, limit: int = 3) -> List[Tuple[str, str]]:
+        """Last (question, answer) pairs for building the prompt"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            messages = list(session['messages'][-2 * limit - 1:]) if session else []
+        exchanges = []
+        for prev, cur in zip(messages, messages[1:]):
+            if prev['role'] == 'user' and cur['role'] == 'assistant':
+                exchanges.append((prev['content'], cur['content']))
+        return exchanges[-limit:]
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
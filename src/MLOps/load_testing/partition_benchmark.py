@@ -0,0 +1,116 @@
+"""
+Benchmark filtered vs unfiltered retrieval on a synthetic corpus.
+
+Builds a flat L2 index of random unit vectors (MiniLM dimension) tagged with a
+skewed category distribution, then times per-query top-k search for:
+
+- unfiltered: the whole index
+- partition: PartitionedIndex with a single category (flat sub-index)
+- selector: PartitionedIndex with two categories (ID selector on the main index)
+- post-filter: over-fetch from the whole index and drop non-matching hits
+
+    python -m src.MLOps.load_testing.partition_benchmark --vectors 200000 --queries 200
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import faiss
+import numpy as np
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.model.partitions import PartitionedIndex, build_partitions
+from src.utils.retrieval_metrics import latency_percentiles
+
+
+def synthetic_corpus(num_vectors: int, dim: int, num_categories: int, seed: int = 0):
+    """Random unit vectors with Zipf-like category sizes"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((num_vectors, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    weights = 1.0 / np.arange(1, num_categories + 1)
+    categories = rng.choice(num_categories, size=num_vectors, p=weights / weights.sum())
+    metadatas = [{'category': f"cat{c}"} for c in categories]
+    return vectors, metadatas
+
+
+def _time_queries(search: Callable[[np.ndarray], object], queries: np.ndarray) -> Dict:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    return {k: v * 1000 for k, v in latency_percentiles(latencies).items()}
+
+
+def run_benchmark(num_vectors: int = 200000, dim: int = 384, num_categories: int = 20,
+                  num_queries: int = 200, k: int = 3, overfetch: int = 50) -> List[Dict]:
+    vectors, metadatas = synthetic_corpus(num_vectors, dim, num_categories)
+    index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    partitions = build_partitions(metadatas)
+    partitioned = PartitionedIndex(index, partitions)
+    queries = vectors[np.random.default_rng(1).choice(num_vectors, num_queries, replace=False)]
+    sizes = partitioned.summary()['category']
+
+    results = [{'mode': 'unfiltered', 'scanned': num_vectors,
+                'latency_ms': _time_queries(lambda q: partitioned.search(q, k), queries)}]
+
+    # Largest, median and smallest category show how latency tracks partition size
+    ordered = sorted(sizes, key=sizes.get, reverse=True)
+    for category in (ordered[0], ordered[len(ordered) // 2], ordered[-1]):
+        filters = {'category': category}
+        partitioned.search(queries[0], k, filters)  # build the sub-index outside the timing
+        results.append({'mode': f'partition {category}', 'scanned': sizes[category],
+                        'latency_ms': _time_queries(lambda q: partitioned.search(q, k, filters), queries)})
+
+    pair = {'category': [ordered[len(ordered) // 2], ordered[-1]]}
+    results.append({'mode': 'selector ' + '+'.join(pair['category']),
+                    'scanned': int(len(partitioned.candidate_ids(pair))),
+                    'latency_ms': _time_queries(lambda q: partitioned.search(q, k, pair), queries)})
+
+    category = ordered[-1]
+    allowed = set(partitions['category'][category])
+
+    def post_filter(query):
+        _, ids = index.search(query.reshape(1, -1), k * overfetch)
+        return [i for i in ids[0] if i in allowed][:k]
+
+    hits = sum(len(post_filter(q)) for q in queries) / (num_queries * k)
+    results.append({'mode': f'post-filter {category}', 'scanned': num_vectors,
+                    'fill_rate': hits, 'latency_ms': _time_queries(post_filter, queries)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtered vs unfiltered FAISS search latency")
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Optional JSON report path")
+    args = parser.parse_args()
+
+    print(f"🚀 Benchmarking {args.queries} queries over {args.vectors} vectors "
+          f"({args.categories} categories, dim {args.dim})")
+    results = run_benchmark(args.vectors, args.dim, args.categories, args.queries, args.k)
+    for r in results:
+        latency = r['latency_ms']
+        extra = f"  fill {r['fill_rate'] * 100:.0f}%" if 'fill_rate' in r else ''
+        print(f"  {r['mode']:<28} scanned {r['scanned']:>8}  "
+              f"p50 {latency['p50']:7.2f}ms  p95 {latency['p95']:7.2f}ms{extra}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
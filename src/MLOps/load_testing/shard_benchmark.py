@@ -0,0 +1,95 @@
+"""
+Benchmark sharded scatter-gather search as the corpus and shard count grow.
+
+For every corpus size, writes the synthetic corpus as 1..N shards, starts a
+ShardedIndex over each layout and times end-to-end top-k search, plus the
+search time inside each shard and the round trip to it. The single-shard
+layout shows the cost of the worker hop against bigger shards.
+
+    python -m src.MLOps.load_testing.shard_benchmark --vectors 100000 400000 --shards 1 2 4
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.MLOps.load_testing.partition_benchmark import synthetic_corpus
+from src.model.sharded_index import ShardedIndex, write_shards
+from src.utils.retrieval_metrics import latency_percentiles
+
+
+def _ms(summary: Dict) -> Dict:
+    return {key: round(value * 1000, 3) for key, value in summary.items()
+            if key.startswith('p') and value is not None}
+
+
+def run_benchmark(corpus_sizes: Sequence[int] = (100000, 400000), shard_counts: Sequence[int] = (1, 2, 4),
+                  dim: int = 384, num_queries: int = 200, k: int = 3) -> List[Dict]:
+    results = []
+    for num_vectors in corpus_sizes:
+        vectors, metadatas = synthetic_corpus(num_vectors, dim, num_categories=20)
+        texts = [f"doc {i}" for i in range(num_vectors)]
+        queries = vectors[np.random.default_rng(1).choice(num_vectors, num_queries, replace=False)]
+        for num_shards in shard_counts:
+            with tempfile.TemporaryDirectory() as directory:
+                write_shards(directory, vectors, texts, metadatas, num_shards)
+                index = ShardedIndex(directory)
+                try:
+                    index.search(queries[0], k)  # warm up the workers outside the timing
+                    latencies = []
+                    for query in queries:
+                        start = time.perf_counter()
+                        index.search(query, k)
+                        latencies.append(time.perf_counter() - start)
+                    stats = index.stats()
+                finally:
+                    index.close()
+            results.append({
+                'vectors': num_vectors,
+                'shards': num_shards,
+                'latency_ms': {key: value * 1000 for key, value in latency_percentiles(latencies).items()},
+                'per_shard': [{'shard': s['shard'], 'vectors': s['vectors'],
+                               'search_ms': _ms(s['search_time']), 'round_trip_ms': _ms(s['round_trip'])}
+                              for s in stats['shards']],
+            })
+            latency = results[-1]['latency_ms']
+            print(f"  {num_vectors:>9} vectors  {num_shards:>2} shards  "
+                  f"p50 {latency['p50']:7.2f}ms  p95 {latency['p95']:7.2f}ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded scatter-gather search latency")
+    parser.add_argument("--vectors", type=int, nargs='+', default=[100000, 400000])
+    parser.add_argument("--shards", type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Optional JSON report path")
+    args = parser.parse_args()
+
+    print(f"🚀 Benchmarking {args.queries} queries for corpus sizes {args.vectors} "
+          f"and shard counts {args.shards} (dim {args.dim})")
+    results = run_benchmark(args.vectors, args.shards, args.dim, args.queries, args.k)
+    print("\n📊 Slowest shard per layout (p95 search / round trip):")
+    for r in results:
+        slowest = max(r['per_shard'], key=lambda s: s['round_trip_ms'].get('p95', 0))
+        print(f"  {r['vectors']:>9} vectors  {r['shards']:>2} shards  shard {slowest['shard']}: "
+              f"{slowest['search_ms'].get('p95', 0):.2f}ms / {slowest['round_trip_ms'].get('p95', 0):.2f}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
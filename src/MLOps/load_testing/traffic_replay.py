@@ -0,0 +1,307 @@
+"""
+Traffic replay and load generation for the chat API.
+
+Replays questions from ModelMonitor's chat_logs.jsonl (preserving or scaling
+their inter-arrival times) or drives open-loop constant-rate / ramp load, either
+against the FastAPI app in-process or against a running server over HTTP.
+
+Run offline against the fake LLM backend:
+
+    LLM_BACKEND=fake python -m src.MLOps.load_testing.traffic_replay --mode ramp \
+        --start-rate 1 --end-rate 50 --duration 120
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.MLOps.monitoring.sketches import LogHistogram
+
+Schedule = List[Tuple[float, str]]
+
+
+def load_logged_questions(log_file: str) -> List[Tuple[datetime, str]]:
+    """Read (timestamp, question) pairs from a log file and its rotated segments"""
+    base, ext = os.path.splitext(log_file)
+    files = sorted(glob.glob(f"{base}.*{ext}"))
+    if os.path.exists(log_file):
+        files.append(log_file)
+    entries = []
+    for path in files:
+        with open(path, 'r') as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry.get('question'):
+                    entries.append((datetime.fromisoformat(entry['timestamp']), entry['question']))
+    entries.sort(key=lambda e: e[0])
+    return entries
+
+
+def replay_schedule(entries: List[Tuple[datetime, str]], speedup: float = 1.0,
+                    max_gap: Optional[float] = None) -> Schedule:
+    """Offsets follow the logged inter-arrival times divided by ``speedup``.
+
+    ``max_gap`` caps idle gaps (e.g. overnight) so replays don't stall.
+    """
+    schedule = []
+    offset = 0.0
+    for i, (timestamp, question) in enumerate(entries):
+        if i:
+            gap = (timestamp - entries[i - 1][0]).total_seconds() / speedup
+            offset += min(gap, max_gap) if max_gap is not None else gap
+        schedule.append((offset, question))
+    return schedule
+
+
+def constant_schedule(questions: List[str], rate: float, duration: float) -> Schedule:
+    """Open-loop arrivals at a fixed rate, cycling through the questions"""
+    count = int(rate * duration)
+    return [(i / rate, questions[i % len(questions)]) for i in range(count)]
+
+
+def ramp_schedule(questions: List[str], start_rate: float, end_rate: float,
+                  duration: float, steps: int = 10) -> Schedule:
+    """Step the arrival rate linearly from start_rate to end_rate"""
+    schedule = []
+    step_seconds = duration / steps
+    index = 0
+    for step in range(steps):
+        rate = start_rate + (end_rate - start_rate) * step / max(steps - 1, 1)
+        step_start = step * step_seconds
+        for i in range(int(rate * step_seconds)):
+            schedule.append((step_start + i / rate, questions[index % len(questions)]))
+            index += 1
+    return schedule
+
+
+class LoadGenerator:
+    """Fires requests on schedule (open loop) and records latency and outcome"""
+
+    def __init__(self, base_url: Optional[str] = None, timeout: float = 60.0,
+                 max_in_flight: int = 1000, use_history: bool = False,
+                 virtual_users: int = 100, rate_limit: bool = False):
+        """
+        Args:
+            base_url: Target server; the app runs in-process when omitted
+            virtual_users: Requests are spread over this many client addresses
+                (sent as X-Forwarded-For, which a server counts per client when it
+                trusts one proxy hop, TRUSTED_PROXY_HOPS=1)
+            rate_limit: Keep the in-process app's per-client rate limit; it is
+                disabled by default so the run measures capacity, not the limit
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.use_history = use_history
+        self.virtual_users = max(1, virtual_users)
+        self.rate_limit = rate_limit
+
+    def _client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=100)
+        if self.base_url:
+            return httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits)
+        from src.MLOps.api.app import app
+        if not self.rate_limit:
+            app.rate_limiter.rate = 0
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+            timeout=self.timeout, limits=limits
+        )
+
+    def _headers(self, index: int) -> Dict[str, str]:
+        user = index % self.virtual_users
+        return {'X-Forwarded-For': f"10.{user // 65536 % 256}.{user // 256 % 256}.{user % 256}"}
+
+    async def _send(self, client, offset: float, question: str, started: float,
+                    results: List[Dict], in_flight: asyncio.Semaphore, headers: Dict[str, str]):
+        record = {'offset': offset, 'lateness': time.perf_counter() - started - offset}
+        if in_flight.locked():
+            # Client-side cap reached: count as shed rather than silently closing the loop
+            record.update({'status': 'client_overload', 'success': False, 'latency': 0.0})
+            results.append(record)
+            return
+        async with in_flight:
+            request_start = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/chat", json={"message": question, "use_history": self.use_history},
+                    headers=headers
+                )
+                record['status'] = response.status_code
+                record['success'] = response.status_code == 200 and response.json().get('success', False)
+            except httpx.TimeoutException:
+                record.update({'status': 'timeout', 'success': False})
+            except Exception as e:
+                record.update({'status': type(e).__name__, 'success': False})
+            record['latency'] = time.perf_counter() - request_start
+            record['completed_at'] = time.perf_counter() - started
+        results.append(record)
+
+    async def run(self, schedule: Schedule) -> List[Dict]:
+        results: List[Dict] = []
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        async with self._client() as client:
+            started = time.perf_counter()
+            tasks = []
+            for index, (offset, question) in enumerate(schedule):
+                delay = offset - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(
+                    self._send(client, offset, question, started, results, in_flight, self._headers(index))
+                ))
+            await asyncio.gather(*tasks)
+        return results
+
+
+def summarize(results: List[Dict], step_seconds: Optional[float] = None,
+              slo_p95: float = 5.0, max_error_rate: float = 0.05) -> Dict:
+    """Latency histogram, error breakdown and (for stepped load) the saturation point"""
+    histogram = LogHistogram()
+    statuses: Dict[str, int] = {}
+    for r in results:
+        statuses[str(r['status'])] = statuses.get(str(r['status']), 0) + 1
+        if r['success']:
+            histogram.add(r['latency'])
+
+    total = len(results)
+    errors = sum(1 for r in results if not r['success'])
+    duration = max((r.get('completed_at', r['offset']) for r in results), default=0.0)
+    summary = {
+        'requests': total,
+        'errors': errors,
+        'error_rate': errors / total if total else 0.0,
+        'status_counts': statuses,
+        'duration_seconds': duration,
+        'achieved_rps': total / duration if duration else 0.0,
+        'latency': histogram.summary(),
+        'latency_histogram': _histogram_bins(histogram),
+        'max_send_lateness': max((r['lateness'] for r in results), default=0.0),
+    }
+
+    if step_seconds:
+        steps = []
+        by_step: Dict[int, List[Dict]] = {}
+        for r in results:
+            by_step.setdefault(int(r['offset'] // step_seconds), []).append(r)
+        for step in sorted(by_step):
+            rows = by_step[step]
+            step_hist = LogHistogram()
+            for r in rows:
+                if r['success']:
+                    step_hist.add(r['latency'])
+            completed = [r for r in rows if r['success']]
+            step_summary = {
+                'step': step,
+                'offered_rps': len(rows) / step_seconds,
+                'goodput_rps': len(completed) / step_seconds,
+                'error_rate': 1 - len(completed) / len(rows),
+                'p95': step_hist.quantile(0.95),
+            }
+            steps.append(step_summary)
+            saturated = (
+                step_summary['error_rate'] > max_error_rate
+                or (step_summary['p95'] or 0) > slo_p95
+                or step_summary['goodput_rps'] < 0.9 * step_summary['offered_rps']
+            )
+            if saturated and 'saturation_rps' not in summary:
+                summary['saturation_rps'] = step_summary['offered_rps']
+        summary['steps'] = steps
+    return summary
+
+
+def _histogram_bins(histogram: LogHistogram, bins: int = 12) -> List[Dict]:
+    """Coarse log-spaced bins suitable for printing"""
+    if not histogram.count:
+        return []
+    low, high = histogram.min, histogram.max
+    if high <= low:
+        return [{'upper': high, 'count': histogram.count}]
+    edges = [low * (high / low) ** (i / bins) for i in range(1, bins + 1)]
+    counts = [0] * bins
+    for index, count in histogram.counts.items():
+        value = histogram.bucket_value(index)
+        position = next((i for i, edge in enumerate(edges) if value <= edge), bins - 1)
+        counts[position] += count
+    return [{'upper': edge, 'count': count} for edge, count in zip(edges, counts)]
+
+
+def print_report(summary: Dict):
+    latency = summary['latency']
+    print(f"📊 {summary['requests']} requests, error rate {summary['error_rate'] * 100:.1f}%, "
+          f"{summary['achieved_rps']:.2f} req/s")
+    if latency['count']:
+        print(f"⏱️ p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  p99 {latency['p99']:.3f}s")
+    peak = max((b['count'] for b in summary['latency_histogram']), default=0)
+    for b in summary['latency_histogram']:
+        bar = '#' * int(40 * b['count'] / peak) if peak else ''
+        print(f"  <= {b['upper']:8.3f}s {b['count']:7d} {bar}")
+    if 'saturation_rps' in summary:
+        print(f"🔥 Saturation at ~{summary['saturation_rps']:.1f} req/s offered")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay chat traffic or generate synthetic load")
+    parser.add_argument("--mode", choices=["replay", "constant", "ramp"], default="replay")
+    parser.add_argument("--logs", default="monitoring/logs/chat_logs.jsonl")
+    parser.add_argument("--url", help="Target server URL; runs the app in-process when omitted")
+    parser.add_argument("--speedup", type=float, default=1.0, help="Replay: divide inter-arrival times")
+    parser.add_argument("--max-gap", type=float, default=None, help="Replay: cap idle gaps (seconds)")
+    parser.add_argument("--rate", type=float, default=5.0, help="Constant: requests per second")
+    parser.add_argument("--start-rate", type=float, default=1.0)
+    parser.add_argument("--end-rate", type=float, default=50.0)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--slo-p95", type=float, default=5.0)
+    parser.add_argument("--virtual-users", type=int, default=100,
+                        help="Distinct client addresses the requests are spread over")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="In-process: keep the app's per-client rate limit")
+    parser.add_argument("--output", default="monitoring/reports/load_test.json")
+    args = parser.parse_args()
+
+    entries = load_logged_questions(args.logs)
+    questions = [q for _, q in entries] or ["What is artificial intelligence?", "hi how are you"]
+
+    step_seconds = None
+    if args.mode == "replay":
+        if not entries:
+            raise SystemExit(f"No logged questions found at {args.logs}")
+        schedule = replay_schedule(entries, args.speedup, args.max_gap)
+    elif args.mode == "constant":
+        schedule = constant_schedule(questions, args.rate, args.duration)
+    else:
+        schedule = ramp_schedule(questions, args.start_rate, args.end_rate, args.duration, args.steps)
+        step_seconds = args.duration / args.steps
+
+    print(f"🚀 Sending {len(schedule)} requests over {schedule[-1][0] if schedule else 0:.1f}s "
+          f"({'HTTP ' + args.url if args.url else 'in-process'})")
+    generator = LoadGenerator(args.url, args.timeout, args.max_in_flight,
+                              virtual_users=args.virtual_users, rate_limit=args.rate_limit)
+    results = asyncio.run(generator.run(schedule))
+    summary = summarize(results, step_seconds, args.slo_p95)
+    summary.update({'mode': args.mode, 'target': args.url or 'in-process',
+                    'timestamp': datetime.now().isoformat()})
+    print_report(summary)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"💾 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,47 @@ class MLflowTracker:
     def __init__(self, experiment_name="gemini_rag_chatbot"):
         self.experiment_name = experiment_name
         mlflow.set_experiment(experiment_name)
-    
+        self._client = mlflow.tracking.MlflowClient()
+        self._interaction_run_id = None
+        self._interaction_run_day = None
+        self._interaction_step = 0
+
+    def _get_interaction_run(self) -> str:
+        """One long-lived run per day collects all chat interaction metrics"""
+        today = datetime.now().strftime('%Y%m%d')
+        if self._interaction_run_id is None or self._interaction_run_day != today:
+            if self._interaction_run_id is not None:
+                self._client.set_terminated(self._interaction_run_id)
+            experiment = mlflow.get_experiment_by_name(self.experiment_name)
+            run = self._client.create_run(experiment.experiment_id, run_name=f"chat_interactions_{today}")
+            self._interaction_run_id = run.info.run_id
+            self._interaction_run_day = today
+            self._interaction_step = 0
+        return self._interaction_run_id
+
+    def log_chat_interactions(self, entries: list):
+        """Log a batch of monitor log entries into the daily interactions run.
+
+        Used as a ModelMonitor writer sink, so it runs on the background writer
+        thread instead of starting a run per request.
+        """
+        from mlflow.entities import Metric
+
+        run_id = self._get_interaction_run()
+        metrics = []
+        for entry in entries:
+            timestamp = int(datetime.fromisoformat(entry['timestamp']).timestamp() * 1000)
+            step = self._interaction_step
+            self._interaction_step += 1
+            metrics.append(Metric("response_time", entry['response_time'], timestamp, step))
+            metrics.append(Metric("sources_used", entry.get('sources_used', 0), timestamp, step))
+            metrics.append(Metric("success", int(entry['success']), timestamp, step))
+            metrics.append(Metric("response_length", entry.get('response_length', 0), timestamp, step))
+
+        # MLflow caps log_batch at 1000 metrics per call
+        for start in range(0, len(metrics), 1000):
+            self._client.log_batch(run_id, metrics=metrics[start:start + 1000])
+
     def log_chat_interaction(self, question: str, response: dict, response_time: float):
         """Log a single chat interaction"""
         with mlflow.start_run(run_name=f"chat_{datetime.now().strftime('%H%M%S')}"):
@@ -0,0 +1,53 @@
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    from .sketches import LogHistogram, SlidingWindow
+except ImportError:
+    from sketches import LogHistogram, SlidingWindow
+
+
+class LiveMetrics:
+    """In-memory streaming metrics for the /metrics endpoint.
+
+    Keeps lifetime latency/prompt-size sketches plus a sliding window for
+    recent rates; memory stays constant regardless of traffic volume.
+    """
+
+    def __init__(self, slot_seconds: int = 10, window_minutes: int = 15):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.window = SlidingWindow(slot_seconds, window_minutes * 60 // slot_seconds)
+        self.latency = LogHistogram()
+        self.prompt_chars = LogHistogram(min_value=1, max_value=1e7)
+        self.total = 0
+        self.errors = 0
+        self.cache_hits = 0
+
+    def record(self, latency: float, success: bool, prompt_chars: Optional[int] = None,
+               cache_hit: bool = False):
+        now = time.time()
+        with self._lock:
+            self.total += 1
+            self.errors += 0 if success else 1
+            self.cache_hits += 1 if cache_hit else 0
+            self.latency.add(latency)
+            if prompt_chars:
+                self.prompt_chars.add(prompt_chars)
+            self.window.record(now, latency, success, prompt_chars, cache_hit)
+
+    def snapshot(self, windows=(60, 300, 900)) -> Dict:
+        now = time.time()
+        with self._lock:
+            return {
+                'uptime_seconds': now - self.started_at,
+                'lifetime': {
+                    'requests': self.total,
+                    'error_rate': self.errors / self.total if self.total else 0.0,
+                    'cache_hit_rate': self.cache_hits / self.total if self.total else 0.0,
+                    'latency': self.latency.summary(),
+                    'prompt_chars': self.prompt_chars.summary(),
+                },
+                'windows': {f"{seconds}s": self.window.summary(now, seconds) for seconds in windows},
+            }
@@ -0,0 +1,157 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class BackgroundLogWriter:
+    """Bounded, batched JSONL writer drained by a daemon thread.
+
+    Callers only ever do a non-blocking queue put; when the queue is full the
+    entry is dropped and counted instead of slowing down the request path.
+    The active file is rotated by size and by calendar day, and every written
+    batch is also handed to optional sinks (e.g. batched MLflow logging).
+    """
+
+    def __init__(self, log_file: str, max_queue: int = 10000, batch_size: int = 256,
+                 flush_interval: float = 1.0, max_bytes: int = 50 * 1024 * 1024,
+                 rotate_daily: bool = True,
+                 sinks: Optional[List[Callable[[List[Dict]], None]]] = None):
+        self.log_file = log_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.sinks = list(sinks or [])
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._current_day = datetime.now().date()
+        self.counters = {
+            'submitted': 0,
+            'written': 0,
+            'dropped': 0,
+            'batches': 0,
+            'rotations': 0,
+            'write_errors': 0,
+            'sink_errors': 0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, entry: Dict) -> bool:
+        """Enqueue an entry without blocking; returns False if it was dropped"""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.counters['dropped'] += 1
+            return False
+        with self._lock:
+            self.counters['submitted'] += 1
+        return True
+
+    def stats(self) -> Dict:
+        """Snapshot of writer counters and current queue depth"""
+        with self._lock:
+            stats = dict(self.counters)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        return stats
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far has been written"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+        return self._queue.unfinished_tasks == 0
+
+    def close(self, timeout: float = 5.0):
+        """Flush remaining entries and stop the writer thread"""
+        if self._stop.is_set():
+            return
+        self.flush(timeout)
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is None:
+                self._queue.task_done()
+                break
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self._stop.set()
+                    self._queue.task_done()
+                    break
+                batch.append(entry)
+
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Dict]):
+        payload = ''.join(json.dumps(entry) + '\n' for entry in batch)
+        try:
+            self._rotate_if_needed(len(payload.encode('utf-8')))
+            with open(self.log_file, 'a') as f:
+                f.write(payload)
+            with self._lock:
+                self.counters['written'] += len(batch)
+                self.counters['batches'] += 1
+        except Exception:
+            with self._lock:
+                self.counters['write_errors'] += 1
+            return
+
+        for sink in self.sinks:
+            try:
+                sink(batch)
+            except Exception:
+                with self._lock:
+                    self.counters['sink_errors'] += 1
+
+    def _rotate_if_needed(self, incoming_bytes: int):
+        if not os.path.exists(self.log_file):
+            self._current_day = datetime.now().date()
+            return
+
+        today = datetime.now().date()
+        new_day = self.rotate_daily and today != self._current_day
+        too_big = os.path.getsize(self.log_file) + incoming_bytes > self.max_bytes
+        if not (new_day or too_big):
+            return
+
+        base, ext = os.path.splitext(self.log_file)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        rotated = f"{base}.{stamp}{ext}"
+        suffix = 1
+        while os.path.exists(rotated):
+            rotated = f"{base}.{stamp}-{suffix}{ext}"
+            suffix += 1
+        os.replace(self.log_file, rotated)
+        self._current_day = today
+        with self._lock:
+            self.counters['rotations'] += 1
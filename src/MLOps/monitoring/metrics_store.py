@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .sketches import LogHistogram
+except ImportError:
+    from sketches import LogHistogram
+
+WINDOWS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+
+
+class MetricsStore:
+    """Per-minute interaction aggregates in SQLite, maintained as logs are written.
+
+    Each batch of log entries updates one row per minute (counts and sums) plus
+    per-minute latency histogram buckets, so a report over any window only
+    scans the minutes in that window - a week is at most 10,080 rows no matter
+    how long the log history is.
+    """
+
+    def __init__(self, db_path: str = "monitoring/metrics.sqlite"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS minute_stats ("
+                "minute INTEGER PRIMARY KEY, count INTEGER, successes INTEGER, "
+                "sum_response_time REAL, sum_sources REAL, sum_response_length REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS minute_latency ("
+                "minute INTEGER, bucket INTEGER, count INTEGER, PRIMARY KEY (minute, bucket))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    @staticmethod
+    def _minute(timestamp: datetime) -> int:
+        return int(timestamp.timestamp() // 60)
+
+    def record_batch(self, entries: List[Dict]):
+        """Fold a batch of ModelMonitor log entries into the minute aggregates"""
+        stats: Dict[int, List[float]] = {}
+        latency: Dict[tuple, int] = {}
+        histogram = LogHistogram()
+
+        for entry in entries:
+            minute = self._minute(datetime.fromisoformat(entry['timestamp']))
+            row = stats.setdefault(minute, [0, 0, 0.0, 0.0, 0.0])
+            row[0] += 1
+            row[1] += int(bool(entry['success']))
+            row[2] += entry['response_time']
+            row[3] += entry.get('sources_used', 0)
+            row[4] += entry.get('response_length', 0)
+            key = (minute, histogram.bucket_index(entry['response_time']))
+            latency[key] = latency.get(key, 0) + 1
+
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO minute_stats VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(minute) DO UPDATE SET "
+                "count = count + excluded.count, successes = successes + excluded.successes, "
+                "sum_response_time = sum_response_time + excluded.sum_response_time, "
+                "sum_sources = sum_sources + excluded.sum_sources, "
+                "sum_response_length = sum_response_length + excluded.sum_response_length",
+                [(minute, *row) for minute, row in stats.items()],
+            )
+            conn.executemany(
+                "INSERT INTO minute_latency VALUES (?, ?, ?) "
+                "ON CONFLICT(minute, bucket) DO UPDATE SET count = count + excluded.count",
+                [(minute, bucket, count) for (minute, bucket), count in latency.items()],
+            )
+
+    def rebuild_from_logs(self, log_files: Iterable[str], batch_size: int = 5000):
+        """Backfill aggregates from existing JSONL logs (one-off, e.g. after upgrading)"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM minute_stats")
+            conn.execute("DELETE FROM minute_latency")
+        for log_file in log_files:
+            batch = []
+            with open(log_file, 'r') as f:
+                for line in f:
+                    batch.append(json.loads(line))
+                    if len(batch) >= batch_size:
+                        self.record_batch(batch)
+                        batch = []
+            if batch:
+                self.record_batch(batch)
+
+    def report(self, window: str = 'day', end: Optional[datetime] = None,
+               start: Optional[datetime] = None) -> Dict:
+        """Aggregate metrics over a named window ('hour'/'day'/'week') or [start, end)"""
+        end = end or datetime.now()
+        if start is None:
+            if window not in WINDOWS:
+                raise ValueError(f"Unknown window '{window}', expected one of {list(WINDOWS)}")
+            start = end - WINDOWS[window]
+        first, last = self._minute(start), self._minute(end)
+
+        with self._connect() as conn:
+            count, successes, sum_rt, sum_sources, sum_length = conn.execute(
+                "SELECT COALESCE(SUM(count), 0), COALESCE(SUM(successes), 0), "
+                "COALESCE(SUM(sum_response_time), 0), COALESCE(SUM(sum_sources), 0), "
+                "COALESCE(SUM(sum_response_length), 0) "
+                "FROM minute_stats WHERE minute >= ? AND minute <= ?",
+                (first, last),
+            ).fetchone()
+            buckets = conn.execute(
+                "SELECT bucket, SUM(count) FROM minute_latency "
+                "WHERE minute >= ? AND minute <= ? GROUP BY bucket",
+                (first, last),
+            ).fetchall()
+
+        histogram = LogHistogram()
+        histogram.add_buckets(buckets)
+        report = {
+            'window_start': start.isoformat(),
+            'window_end': end.isoformat(),
+            'total_interactions': count,
+        }
+        if not count:
+            return report
+
+        report.update({
+            'success_rate': successes / count * 100,
+            'avg_response_time': sum_rt / count,
+            'avg_sources_used': sum_sources / count,
+            'avg_response_length': sum_length / count,
+            'error_count': count - successes,
+            'p50_response_time': histogram.quantile(0.5),
+            'p90_response_time': histogram.quantile(0.9),
+            'p95_response_time': histogram.quantile(0.95),
+            'p99_response_time': histogram.quantile(0.99),
+        })
+        return report
@@ -1,57 +1,109 @@
 import json
-import pandas as pd
-from datetime import datetime, timedelta
+import glob
+from datetime import datetime
 import os
 
+try:
+    from .log_writer import BackgroundLogWriter
+    from .metrics_store import MetricsStore
+    from .live_metrics import LiveMetrics
+except ImportError:
+    from log_writer import BackgroundLogWriter
+    from metrics_store import MetricsStore
+    from live_metrics import LiveMetrics
+
 class ModelMonitor:
-    def __init__(self, log_file="monitoring/logs/chat_logs.jsonl"):
+    def __init__(self, log_file="monitoring/logs/chat_logs.jsonl", async_logging: bool = True,
+                 mlflow_tracker=None, metrics_db: str = None, **writer_kwargs):
+        """
+        Args:
+            log_file: Active JSONL log file; rotated segments sit next to it
+            async_logging: If True, entries go through a bounded background writer
+                so logging never blocks the caller
+            mlflow_tracker: Optional MLflowTracker that receives each written batch
+            metrics_db: SQLite file for incremental aggregates (defaults next to the logs)
+            writer_kwargs: Passed to BackgroundLogWriter (max_queue, batch_size, ...)
+        """
         self.log_file = log_file
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        self.metrics_store = MetricsStore(
+            metrics_db or os.path.join(os.path.dirname(log_file), "metrics.sqlite")
+        )
+        self.live_metrics = LiveMetrics()
+        self.writer = None
+        if async_logging:
+            sinks = [self.metrics_store.record_batch]
+            if mlflow_tracker:
+                sinks.append(mlflow_tracker.log_chat_interactions)
+            self.writer = BackgroundLogWriter(log_file, sinks=sinks, **writer_kwargs)
     
     def log_interaction(self, question: str, response: dict, response_time: float):
-        """Log chat interaction for monitoring"""
+        """Log chat interaction for monitoring (non-blocking when async_logging is on)"""
         log_entry = {
             'timestamp': datetime.now().isoformat(),
             'question': question,
             'response_length': len(response.get('answer', '')),
             'response_time': response_time,
             'sources_used': response.get('sources_count', 0),
+            'prompt_chars': response.get('prompt_chars', 0),
+            'cache_hit': bool(response.get('cache_hit', False)),
+            'route': response.get('route', ''),
             'success': response['success'],
             'error': '' if response['success'] else response.get('answer', '')
         }
+        self.live_metrics.record(
+            response_time, response['success'], log_entry['prompt_chars'], log_entry['cache_hit']
+        )
+        
+        if self.writer is not None:
+            self.writer.submit(log_entry)
+            return
         
         with open(self.log_file, 'a') as f:
             f.write(json.dumps(log_entry) + '\n')
+        self.metrics_store.record_batch([log_entry])
+    
+    def live_snapshot(self) -> dict:
+        """Streaming latency/error/prompt-size/cache-hit metrics held in memory"""
+        return self.live_metrics.snapshot()
+    
+    def logging_stats(self) -> dict:
+        """Counters of the background writer (submitted/written/dropped/...)"""
+        if self.writer is None:
+            return {'async_logging': False}
+        return {'async_logging': True, **self.writer.stats()}
+    
+    def close(self):
+        """Flush pending log entries and stop the writer thread"""
+        if self.writer is not None:
+            self.writer.close()
+    
+    def _log_segments(self):
+        """Active log file plus any rotated segments"""
+        base, ext = os.path.splitext(self.log_file)
+        segments = sorted(glob.glob(f"{base}.*{ext}"))
+        if os.path.exists(self.log_file):
+            segments.append(self.log_file)
+        return segments
+    
+    def rebuild_metrics(self):
+        """Backfill the metrics store from all existing log segments"""
+        self.metrics_store.rebuild_from_logs(self._log_segments())
+    
+    def report(self, window: str = 'day', start: datetime = None, end: datetime = None) -> dict:
+        """Performance report over 'hour'/'day'/'week' or an explicit [start, end) range"""
+        report = self.metrics_store.report(window=window, start=start, end=end)
+        report['report_date'] = datetime.now().isoformat()
+        return report
     
     def generate_daily_report(self):
         """Generate daily performance report"""
         try:
-            # Read logs from last 24 hours
-            cutoff_time = datetime.now() - timedelta(hours=24)
-            
-            logs = []
-            with open(self.log_file, 'r') as f:
-                for line in f:
-                    log = json.loads(line)
-                    log_time = datetime.fromisoformat(log['timestamp'])
-                    if log_time >= cutoff_time:
-                        logs.append(log)
-            
-            if not logs:
+            # Served from the incremental aggregates, not by re-reading the logs
+            report = self.report('day')
+            if not report['total_interactions']:
                 return {"message": "No logs in the last 24 hours"}
             
-            df = pd.DataFrame(logs)
-            
-            report = {
-                'report_date': datetime.now().isoformat(),
-                'total_interactions': len(df),
-                'success_rate': (df['success'].sum() / len(df)) * 100,
-                'avg_response_time': df['response_time'].mean(),
-                'avg_sources_used': df['sources_used'].mean(),
-                'avg_response_length': df['response_length'].mean(),
-                'error_count': len(df[df['success'] == False])
-            }
-            
             # Save report
             report_file = f"monitoring/reports/daily_report_{datetime.now().strftime('%Y%m%d')}.json"
             os.makedirs(os.path.dirname(report_file), exist_ok=True)
@@ -61,8 +113,6 @@ class ModelMonitor:
             
             return report
             
-        except FileNotFoundError:
-            return {"error": "No log file found"}
         except Exception as e:
             return {"error": str(e)}
 
@@ -75,6 +125,7 @@ def test_monitoring():
         'sources_count': 2
     }
     monitor.log_interaction("Test question", sample_response, 1.2)
+    monitor.writer.flush()
     
     report = monitor.generate_daily_report()
     print("📊 Monitoring Report:", report)
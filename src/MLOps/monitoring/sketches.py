@@ -0,0 +1,160 @@
+import math
+from typing import Dict, Iterable, Optional
+
+
+class LogHistogram:
+    """Log-bucketed histogram (HDR-style) with bounded relative error.
+
+    Values are mapped to buckets whose boundaries grow geometrically by
+    ``1 + relative_error``, so any quantile is reported within that relative
+    error and memory depends only on the value range, never on the number of
+    samples recorded.
+    """
+
+    def __init__(self, relative_error: float = 0.02, min_value: float = 1e-4,
+                 max_value: float = 1e4):
+        self.relative_error = relative_error
+        self.min_value = min_value
+        self.max_value = max_value
+        self._log_base = math.log1p(relative_error)
+        self.max_bucket = self.bucket_index(max_value)
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def bucket_index(self, value: float) -> int:
+        """Bucket that a value falls into (values below min_value share bucket 0)"""
+        if value <= self.min_value:
+            return 0
+        value = min(value, self.max_value)
+        return int(math.log(value / self.min_value) / self._log_base) + 1
+
+    def bucket_value(self, index: int) -> float:
+        """Representative (midpoint) value of a bucket"""
+        if index <= 0:
+            return self.min_value
+        lower = self.min_value * math.exp((index - 1) * self._log_base)
+        return lower * (1 + self.relative_error / 2)
+
+    def add(self, value: float, count: int = 1):
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LogHistogram"):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def add_buckets(self, buckets: Iterable):
+        """Add (bucket_index, count) pairs, e.g. loaded from a store"""
+        for index, count in buckets:
+            self.counts[index] = self.counts.get(index, 0) + count
+            self.count += count
+            self.total += self.bucket_value(index) * count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                value = self.bucket_value(index)
+                # Exact extremes are tracked, so clamp to them when known
+                if self.min is not None:
+                    value = max(value, self.min)
+                if self.max is not None:
+                    value = min(value, self.max)
+                return value
+        return self.max
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def summary(self, quantiles=(0.5, 0.9, 0.95, 0.99)) -> Dict:
+        result = {'count': self.count, 'mean': self.mean(), 'min': self.min, 'max': self.max}
+        for q in quantiles:
+            result[f"p{int(q * 100)}"] = self.quantile(q)
+        return result
+
+
+class _WindowSlot:
+    __slots__ = ('start', 'count', 'errors', 'cache_hits', 'latency', 'prompt_chars')
+
+    def __init__(self, start: int):
+        self.start = start
+        self.count = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.latency = LogHistogram()
+        self.prompt_chars = LogHistogram(min_value=1, max_value=1e7)
+
+
+class SlidingWindow:
+    """Fixed ring of time slots holding counters and histograms.
+
+    Memory is bounded by ``num_slots`` times the histogram bucket count, and
+    any trailing window up to ``num_slots * slot_seconds`` can be summarized
+    by merging the slots that fall inside it.
+    """
+
+    def __init__(self, slot_seconds: int = 10, num_slots: int = 90):
+        self.slot_seconds = slot_seconds
+        self.num_slots = num_slots
+        self._slots: Dict[int, _WindowSlot] = {}
+
+    def _slot(self, now: float) -> _WindowSlot:
+        start = int(now // self.slot_seconds)
+        position = start % self.num_slots
+        slot = self._slots.get(position)
+        if slot is None or slot.start != start:
+            slot = _WindowSlot(start)
+            self._slots[position] = slot
+        return slot
+
+    def record(self, now: float, latency: float, success: bool,
+               prompt_chars: Optional[int] = None, cache_hit: bool = False):
+        slot = self._slot(now)
+        slot.count += 1
+        slot.errors += 0 if success else 1
+        slot.cache_hits += 1 if cache_hit else 0
+        slot.latency.add(latency)
+        if prompt_chars:
+            slot.prompt_chars.add(prompt_chars)
+
+    def summary(self, now: float, seconds: int) -> Dict:
+        """Rates and quantiles over the trailing ``seconds``"""
+        seconds = min(seconds, self.slot_seconds * self.num_slots)
+        oldest = int((now - seconds) // self.slot_seconds) + 1
+        newest = int(now // self.slot_seconds)
+        latency = LogHistogram()
+        prompt_chars = LogHistogram(min_value=1, max_value=1e7)
+        count = errors = cache_hits = 0
+        for slot in self._slots.values():
+            if oldest <= slot.start <= newest:
+                count += slot.count
+                errors += slot.errors
+                cache_hits += slot.cache_hits
+                latency.merge(slot.latency)
+                prompt_chars.merge(slot.prompt_chars)
+        return {
+            'window_seconds': seconds,
+            'requests': count,
+            'requests_per_second': count / seconds if seconds else 0.0,
+            'error_rate': errors / count if count else 0.0,
+            'cache_hit_rate': cache_hits / count if count else 0.0,
+            'latency': latency.summary(),
+            'prompt_chars': prompt_chars.summary(),
+        }
@@ -0,0 +1,181 @@
+"""
+Token-aware chunking for the retrieval corpus.
+
+Chunk length is measured in tokens of the embedding model's tokenizer rather
+than characters, so no chunk exceeds what the embedder actually reads
+(all-MiniLM-L6-v2 truncates after 256 tokens). Most Persona-Chat Q/A documents
+are far shorter than one chunk:
+
+- documents with fewer characters than the token budget cannot exceed it
+  (a WordPiece token always covers at least one character) and are kept
+  whole without tokenizing;
+- the rest are tokenized in batches with the fast tokenizer, kept whole when
+  they fit, and otherwise cut into overlapping token windows on word
+  boundaries using the tokenizer's character offsets;
+- large inputs are tokenized in parallel worker processes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+Span = Tuple[int, int]
+
+_worker_chunker = None
+
+
+def _init_worker(tokenizer, max_tokens: int, overlap_tokens: int):
+    global _worker_chunker
+    _worker_chunker = TokenChunker(tokenizer=tokenizer, max_tokens=max_tokens,
+                                   overlap_tokens=overlap_tokens, workers=1)
+
+
+def _worker_spans(texts: List[str]):
+    return _worker_chunker._spans_for_batch(texts)
+
+
+class TokenChunker:
+    """Split texts into chunks of at most ``max_tokens`` embedding-model tokens"""
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 max_tokens: int = 256, overlap_tokens: int = 32, batch_size: int = 1024,
+                 workers: Optional[int] = None, parallel_threshold: int = 20000,
+                 tokenizer=None):
+        """
+        Args:
+            model_name: Embedding model whose tokenizer defines chunk length
+            max_tokens: Model input limit including [CLS]/[SEP]
+            overlap_tokens: Tokens shared by consecutive chunks of a long document
+            batch_size: Texts per batch-tokenization call
+            workers: Worker processes for large inputs (default: CPU count)
+            parallel_threshold: Minimum texts needing tokenization before using workers
+            tokenizer: Preloaded fast tokenizer (loaded from model_name when omitted)
+        """
+        if tokenizer is None:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        self.tokenizer = tokenizer
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        # Room left after the special tokens the embedder adds
+        self.content_tokens = max_tokens - tokenizer.num_special_tokens_to_add()
+        if not 0 <= overlap_tokens < self.content_tokens:
+            raise ValueError("overlap_tokens must be smaller than the token budget")
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+
+    def cache_params(self) -> Dict:
+        """Settings that affect the output, used for stage cache keys"""
+        return {
+            'chunker': 'tokens',
+            'model_name': self.model_name,
+            'max_tokens': self.max_tokens,
+            'overlap_tokens': self.overlap_tokens,
+        }
+
+    def _window_spans(self, offsets: Sequence[Tuple[int, int]]) -> List[Span]:
+        """Character spans of overlapping token windows, ending on word boundaries"""
+        spans = []
+        total = len(offsets)
+        start = 0
+        while start < total:
+            end = min(start + self.content_tokens, total)
+            # Don't cut inside a word: back off while the next token continues it
+            while start + 1 < end < total and offsets[end][0] == offsets[end - 1][1]:
+                end -= 1
+            spans.append((offsets[start][0], offsets[end - 1][1]))
+            if end == total:
+                break
+            start = max(end - self.overlap_tokens, start + 1)
+        return spans
+
+    def _spans_for_batch(self, texts: List[str]) -> Tuple[List[List[Span]], List[List[int]]]:
+        """Spans and per-chunk token counts for texts that need tokenizing"""
+        encoded = self.tokenizer(
+            texts, add_special_tokens=False, return_offsets_mapping=True,
+            return_attention_mask=False, return_token_type_ids=False
+        )
+        all_spans, all_lengths = [], []
+        for text, ids, offsets in zip(texts, encoded['input_ids'], encoded['offset_mapping']):
+            if len(ids) <= self.content_tokens:
+                all_spans.append([(0, len(text))])
+                all_lengths.append([len(ids)])
+                continue
+            spans = self._window_spans(offsets)
+            all_spans.append(spans)
+            starts = np.array([s for s, _ in offsets])
+            all_lengths.append([
+                int(np.searchsorted(starts, e, side='left') - np.searchsorted(starts, s, side='left'))
+                for s, e in spans
+            ])
+        return all_spans, all_lengths
+
+    def chunk_texts(self, texts: Sequence[str]) -> Tuple[List[Tuple[int, str]], Dict]:
+        """Return ([(text index, chunk text)], stats)"""
+        texts = list(texts)
+        pending = [i for i, text in enumerate(texts) if len(text) > self.content_tokens]
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        batch_texts = [[texts[i] for i in batch] for batch in batches]
+
+        if len(pending) >= self.parallel_threshold and self.workers > 1:
+            with ProcessPoolExecutor(
+                self.workers, initializer=_init_worker,
+                initargs=(self.tokenizer, self.max_tokens, self.overlap_tokens)
+            ) as executor:
+                results = list(executor.map(_worker_spans, batch_texts))
+        else:
+            results = [self._spans_for_batch(batch) for batch in batch_texts]
+
+        spans_by_text: Dict[int, List[Span]] = {}
+        token_lengths: List[int] = []
+        split_texts = 0
+        over_limit = 0
+        for batch, (batch_spans, batch_lengths) in zip(batches, results):
+            for index, spans, lengths in zip(batch, batch_spans, batch_lengths):
+                spans_by_text[index] = spans
+                token_lengths.extend(lengths)
+                if len(spans) > 1:
+                    split_texts += 1
+                    over_limit += 1
+                elif lengths[0] > self.content_tokens:
+                    over_limit += 1
+
+        chunks = []
+        for index, text in enumerate(texts):
+            for start, end in spans_by_text.get(index, [(0, len(text))]):
+                chunks.append((index, text[start:end]))
+
+        stats = {
+            'documents': len(texts),
+            'short_circuited': len(texts) - len(pending),
+            'tokenized': len(pending),
+            'split_documents': split_texts,
+            'chunks': len(chunks),
+            # Documents the embedder would have truncated had they been embedded whole
+            'would_truncate': over_limit,
+            # Chunks still longer than the model reads (should be 0)
+            'truncated_chunks': sum(1 for n in token_lengths if n > self.content_tokens),
+            'token_lengths': _distribution(token_lengths),
+        }
+        return chunks, stats
+
+
+def _distribution(values: List[int]) -> Dict:
+    """Percentiles and a coarse histogram of token counts for tokenized chunks"""
+    if not values:
+        return {'count': 0}
+    arr = np.asarray(values)
+    edges = [0, 32, 64, 128, 192, 256, 384, 512]
+    counts, _ = np.histogram(arr, bins=edges + [max(int(arr.max()) + 1, edges[-1] + 1)])
+    return {
+        'count': int(arr.size),
+        'mean': float(arr.mean()),
+        'p50': float(np.percentile(arr, 50)),
+        'p95': float(np.percentile(arr, 95)),
+        'max': int(arr.max()),
+        'histogram': {f"<{edges[i + 1]}" if i + 1 < len(edges) else f">={edges[-1]}": int(c)
+                      for i, c in enumerate(counts)},
+    }
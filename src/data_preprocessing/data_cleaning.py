@@ -97,8 +97,10 @@ class PersonaChatProcessor:
     
     def process_dataset(self):
         """Main processing pipeline"""
-        raw_data = self.load_dataset()
-        conversations = self.extract_conversations(raw_data)
+        return self.process_records(self.load_dataset())
+    
+    def process_records(self, raw_data):
+        """Clean the training pairs of already loaded records (e.g. one collected file)"""
         training_pairs = self.create_training_pairs(raw_data)
         
         # Preprocess all conversations
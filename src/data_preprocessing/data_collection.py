@@ -0,0 +1,168 @@
+"""
+Collect raw conversation files for the cleaning stage.
+
+Discovers CSV/JSON/JSONL files (optionally .gz/.bz2/.xz compressed) under a
+directory, parses them in worker processes and yields them one file at a time
+in a stable order, so cleaning starts before everything is read and memory
+stays bounded. A checkpoint records every finished file, so an interrupted
+run resumes after the last one.
+"""
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import pandas as pd
+
+FORMATS = ('.csv', '.json', '.jsonl')
+COMPRESSIONS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+class RawFile(NamedTuple):
+    path: str
+    records: List[Dict]
+    bytes: int
+
+
+def split_suffix(path: Path):
+    """(format, compression) of a file name, e.g. ('.jsonl', '.gz')"""
+    suffixes = [s.lower() for s in path.suffixes]
+    compression = suffixes.pop() if suffixes and suffixes[-1] in COMPRESSIONS else None
+    return (suffixes[-1] if suffixes else ''), compression
+
+
+def discover_files(raw_path: str) -> List[Path]:
+    """Supported files under a directory (recursively), or the file itself"""
+    path = Path(raw_path)
+    if path.is_file():
+        return [path]
+    return sorted(p for p in path.rglob('*') if p.is_file() and split_suffix(p)[0] in FORMATS)
+
+
+def file_signature(path: Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def read_records(path: str) -> List[Dict]:
+    """Parse one raw file into a list of records"""
+    fmt, compression = split_suffix(Path(path))
+    opener = COMPRESSIONS.get(compression, open)
+    if fmt == '.csv':
+        return pd.read_csv(path).to_dict(orient='records')  # Compression inferred from the suffix
+    with opener(path, 'rt', encoding='utf-8') as f:
+        text = f.read()
+    if fmt == '.json':
+        try:
+            data = json.loads(text)
+            # Either a list of records or {"split": [records, ...], ...}
+            if isinstance(data, dict):
+                lists = [v for v in data.values() if isinstance(v, list)]
+                return [r for v in lists for r in v] if lists else [data]
+            return data
+        except json.JSONDecodeError:
+            pass  # JSON Lines saved as .json
+    return [json.loads(line) for line in io.StringIO(text) if line.strip()]
+
+
+def _read_job(path: str) -> RawFile:
+    return RawFile(path, read_records(path), os.path.getsize(path))
+
+
+class Checkpoint:
+    """Finished files and output size, saved after every file"""
+
+    def __init__(self, path: str, params: Dict):
+        self.path = path
+        self.params = params
+        self.state = {'params': params, 'output_bytes': 0, 'files': {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('params') == params:
+                self.state = saved
+
+    @property
+    def output_bytes(self) -> int:
+        return self.state['output_bytes']
+
+    def is_done(self, path: Path) -> bool:
+        entry = self.state['files'].get(str(path))
+        return entry is not None and entry['signature'] == file_signature(path)
+
+    def is_stale(self) -> bool:
+        """True if a finished file has since changed or gone, so its rows are outdated"""
+        return any(not Path(path).exists() or entry['signature'] != file_signature(Path(path))
+                   for path, entry in self.state['files'].items())
+
+    def mark_done(self, path: str, rows: int, output_bytes: int):
+        self.state['files'][path] = {'signature': file_signature(Path(path)), 'rows': rows}
+        self.state['output_bytes'] = output_bytes
+        self.save()
+
+    def reset(self):
+        self.state = {'params': self.params, 'output_bytes': 0, 'files': {}}
+        self.save()
+
+    def save(self):
+        # Write-then-rename so a crash never leaves a truncated checkpoint
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class DataCollector:
+    def __init__(self, raw_path: str, workers: Optional[int] = None, checkpoint: Checkpoint = None):
+        """
+        Args:
+            raw_path: Directory of raw files (or a single file)
+            workers: Parsing processes; files are parsed inline when 1
+            checkpoint: Files it lists as done (with unchanged size/mtime) are skipped
+        """
+        self.raw_path = raw_path
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint = checkpoint
+        self.stats = {'files': 0, 'skipped': 0, 'records': 0, 'bytes': 0, 'seconds': 0.0}
+
+    def collect(self) -> Iterator[RawFile]:
+        """Yield parsed files in discovery order, at most 2 per worker in flight"""
+        files = discover_files(self.raw_path)
+        pending_files = [p for p in files if not (self.checkpoint and self.checkpoint.is_done(p))]
+        self.stats['skipped'] = len(files) - len(pending_files)
+        start = time.perf_counter()
+        for raw_file in self._read(str(p) for p in pending_files):
+            self.stats['files'] += 1
+            self.stats['records'] += len(raw_file.records)
+            self.stats['bytes'] += raw_file.bytes
+            self.stats['seconds'] = time.perf_counter() - start
+            yield raw_file
+        self.stats['seconds'] = time.perf_counter() - start
+
+    def _read(self, paths: Iterator[str]) -> Iterator[RawFile]:
+        if self.workers == 1:
+            for path in paths:
+                yield _read_job(path)
+            return
+        with ProcessPoolExecutor(self.workers) as executor:
+            pending = []
+            for path in paths:
+                pending.append(executor.submit(_read_job, path))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+    def throughput(self) -> Dict:
+        seconds = self.stats['seconds']
+        return {
+            **self.stats,
+            'files_per_second': self.stats['files'] / seconds if seconds else 0.0,
+            'bytes_per_second': self.stats['bytes'] / seconds if seconds else 0.0,
+        }
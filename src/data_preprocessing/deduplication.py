@@ -0,0 +1,206 @@
+"""
+Near-duplicate detection for the retrieval corpus.
+
+Persona-Chat contains many near-identical utterances ("hi how are you"), which
+bloat the FAISS index and crowd the top-k results with copies of the same text.
+Two passes are provided:
+
+- MinHashDeduplicator: MinHash signatures + LSH banding over character shingles,
+  run on the documents before they are split and embedded.
+- SemanticDeduplicator: greedy cosine-similarity filtering in embedding space,
+  run on the chunk vectors before the index is built.
+"""
+import re
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_for_dedup(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace so trivial variants compare equal"""
+    text = re.sub(r'[^a-z0-9\s]', ' ', text.lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class MinHashDeduplicator:
+    """Greedy near-duplicate removal with MinHash/LSH, keeping the first occurrence"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 16,
+                 shingle_size: int = 5, seed: int = 42):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm).astype(np.int64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm).astype(np.int64)
+
+    def cache_params(self) -> Dict:
+        """Settings that affect the output, used for stage cache keys"""
+        return {
+            'threshold': self.threshold,
+            'num_perm': self.num_perm,
+            'bands': self.bands,
+            'shingle_size': self.shingle_size,
+        }
+
+    def _shingles(self, text: str) -> np.ndarray:
+        text = normalize_for_dedup(text)
+        k = self.shingle_size
+        if len(text) <= k:
+            grams = {text}
+        else:
+            grams = {text[i:i + k] for i in range(len(text) - k + 1)}
+        # crc32 is stable across processes, unlike hash()
+        return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.int64) % _MERSENNE_PRIME
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a text"""
+        shingles = self._shingles(text)
+        hashed = (np.outer(shingles, self._a) + self._b) % _MERSENNE_PRIME
+        return hashed.min(axis=0)
+
+    def keep_mask(self, texts: Sequence[str]) -> List[bool]:
+        """Return a mask of texts to keep; later near-duplicates of kept texts are dropped"""
+        buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        signatures: Dict[int, np.ndarray] = {}
+        keep = []
+
+        for idx, text in enumerate(texts):
+            sig = self.signature(text)
+            band_keys = [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+            candidates = set()
+            for band, key in enumerate(band_keys):
+                candidates.update(buckets[band].get(key, ()))
+
+            is_duplicate = any(
+                np.mean(signatures[c] == sig) >= self.threshold for c in candidates
+            )
+            keep.append(not is_duplicate)
+            if is_duplicate:
+                continue
+
+            signatures[idx] = sig
+            for band, key in enumerate(band_keys):
+                buckets[band].setdefault(key, []).append(idx)
+
+        return keep
+
+
+class SemanticDeduplicator:
+    """Greedy removal of vectors whose cosine similarity to a kept vector exceeds a threshold"""
+
+    def __init__(self, threshold: float = 0.95, block_size: int = 1024):
+        self.threshold = threshold
+        self.block_size = block_size
+
+    def cache_params(self) -> Dict:
+        return {'threshold': self.threshold}
+
+    def keep_mask(self, vectors: Sequence[Sequence[float]]) -> List[bool]:
+        """Return a mask of vectors to keep, processing in blocks against the kept set"""
+        import faiss
+
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        if len(matrix) == 0:
+            return []
+        kept_index = faiss.IndexFlatIP(matrix.shape[1])
+        keep = np.zeros(len(matrix), dtype=bool)
+
+        for start in range(0, len(matrix), self.block_size):
+            block = matrix[start:start + self.block_size]
+            block_keep = np.ones(len(block), dtype=bool)
+
+            # Drop anything already covered by a previously kept vector
+            if kept_index.ntotal:
+                sims, _ = kept_index.search(block, 1)
+                block_keep &= sims[:, 0] < self.threshold
+
+            # Greedy pass within the block
+            block_sims = block @ block.T
+            for i in range(len(block)):
+                if not block_keep[i]:
+                    continue
+                later = block_sims[i, i + 1:] >= self.threshold
+                block_keep[i + 1:][later] = False
+
+            keep[start:start + len(block)] = block_keep
+            kept_index.add(block[block_keep])
+
+        return keep.tolist()
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def measure_retrieval_effect(texts_before: List[str], vectors_before: Sequence[Sequence[float]],
+                             texts_after: List[str], vectors_after: Sequence[Sequence[float]],
+                             num_queries: int = 200, k: int = 3, seed: int = 42) -> Dict:
+    """Compare index size, search latency and top-k context diversity before/after dedup.
+
+    Queries are a random sample of the original chunk vectors, so both indexes
+    are probed with realistic in-distribution queries.
+    """
+    import faiss
+
+    before = np.asarray(vectors_before, dtype=np.float32)
+    after = np.asarray(vectors_after, dtype=np.float32)
+    rng = np.random.RandomState(seed)
+    queries = before[rng.choice(len(before), size=min(num_queries, len(before)), replace=False)]
+
+    def probe(texts: List[str], matrix: np.ndarray) -> Dict:
+        index = faiss.IndexFlatL2(matrix.shape[1])
+        index.add(matrix)
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query[None, :], k)
+        latency_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+
+        _, ids = index.search(queries, k)
+        unique_ratios = []
+        for row in ids:
+            retrieved = [normalize_for_dedup(texts[i]) for i in row if i >= 0]
+            if retrieved:
+                unique_ratios.append(len(set(retrieved)) / len(retrieved))
+        return {
+            'num_vectors': int(index.ntotal),
+            'index_bytes': int(index.ntotal * matrix.shape[1] * 4),
+            'avg_search_ms': round(latency_ms, 4),
+            'top_k_unique_ratio': round(float(np.mean(unique_ratios)) if unique_ratios else 0.0, 4),
+        }
+
+    stats_before = probe(texts_before, before)
+    stats_after = probe(texts_after, after)
+    shrink = 1 - stats_after['num_vectors'] / max(stats_before['num_vectors'], 1)
+    return {
+        'before': stats_before,
+        'after': stats_after,
+        'index_shrink_pct': round(shrink * 100, 2),
+        'k': k,
+        'num_queries': len(queries),
+    }
+
+
+def summarize_dedup(stage: str, total: int, kept: int, extra: Optional[Dict] = None) -> Dict:
+    """Small report dict for one dedup pass"""
+    summary = {
+        'stage': stage,
+        'input': total,
+        'kept': kept,
+        'removed': total - kept,
+        'removed_pct': round((total - kept) / total * 100, 2) if total else 0.0,
+    }
+    if extra:
+        summary.update(extra)
+    return summary
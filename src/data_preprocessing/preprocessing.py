@@ -4,13 +4,39 @@ from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet',
+}
+
+
+def ensure_nltk_data():
+    """Download the NLTK resources preprocessing needs, only if missing"""
+    for name, resource in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(name, quiet=True)
+
+
 class DataPreprocessor:
+    # Bump when the cleaning/normalization rules change so cached outputs are invalidated
+    VERSION = 1
+
     def __init__(self):
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-        nltk.download('wordnet', quiet=True)
+        ensure_nltk_data()
         self.stop_words = set(stopwords.words('english'))
         self.lemmatizer = WordNetLemmatizer()
+
+    def cache_params(self):
+        """Settings that affect preprocessing output, used for stage cache keys"""
+        return {
+            'version': self.VERSION,
+            'stop_words': 'english',
+            'lemmatizer': 'wordnet',
+        }
     
     def clean_text(self, text):
         # Remove usernames, timestamps, and non-textual data
@@ -0,0 +1,201 @@
+import uuid
+
+import requests
+import streamlit as st
+
+from src.frontend.chat_client import ChatAPIClient
+
+
+@st.cache_resource(show_spinner=False)
+def get_chat_client(api_url: str, health_timeout: float = 5,
+                    offline_message: str = "❌ API server is not running.") -> ChatAPIClient:
+    """One pooled client per API URL, shared across reruns and sessions"""
+    return ChatAPIClient(api_url, health_timeout=health_timeout, offline_message=offline_message)
+
+
+WINDOW_SIZE = 20  # Messages kept and rendered by default
+PAGE_SIZE = 20    # Messages fetched per "load older" click
+
+
+def _reset_history():
+    st.session_state.messages = []
+    st.session_state.first_index = 0  # Server-side index of messages[0]
+    st.session_state.window_size = WINDOW_SIZE
+    st.session_state.has_older = False
+
+
+def _render_message(message):
+    if message["role"] == "user":
+        st.markdown(f"**You:** {message['content']}")
+    else:
+        st.markdown(f"**Assistant:** {message['content']}")
+        if message.get("sources"):
+            st.caption(f"📚 Used {message['sources']} knowledge sources")
+    st.markdown("---")
+
+
+def _append_to_window(*messages):
+    """Append new messages, dropping the oldest beyond the window size"""
+    st.session_state.messages.extend(messages)
+    overflow = len(st.session_state.messages) - st.session_state.window_size
+    if overflow > 0:
+        del st.session_state.messages[:overflow]
+        st.session_state.first_index += overflow
+        st.session_state.has_older = True
+
+
+def _load_older(client: ChatAPIClient):
+    """Prepend the previous page of the transcript from the API"""
+    try:
+        page = client.history(st.session_state.client_id, before=st.session_state.first_index, limit=PAGE_SIZE)
+    except requests.exceptions.RequestException as e:
+        st.error(f"❌ Could not load older messages: {str(e)}")
+        return
+    older = page["messages"]
+    if older:
+        st.session_state.messages = older + st.session_state.messages
+        st.session_state.first_index = older[0]["index"]
+        st.session_state.window_size += len(older)
+    st.session_state.has_older = page["has_older"]
+
+
+def render_chat_app(default_api_url: str, api_url_help: str, guide_title: str,
+                    guide_markdown: str, health_timeout: float, offline_message: str):
+    """Render the chat UI shared by streamlit_app.py and streamlit_cloud.py"""
+    # Page configuration
+    st.set_page_config(
+        page_title="Personalized RAG Chatbot",
+        page_icon="🤖",
+        layout="wide"
+    )
+
+    # Simple CSS for better readability (no colors)
+    st.markdown("""
+    <style>
+        .main-header {
+            font-size: 2.5rem;
+            color: #1f77b4;
+            text-align: center;
+            margin-bottom: 2rem;
+        }
+        .chat-container {
+            max-height: 500px;
+            overflow-y: auto;
+            padding: 1rem;
+            margin-bottom: 1rem;
+        }
+    </style>
+    """, unsafe_allow_html=True)
+
+    # Header
+    st.markdown('<div class="main-header">🤖 Personalized RAG Chatbot</div>', unsafe_allow_html=True)
+
+    # API Configuration
+    with st.sidebar:
+        st.header("🔧 Configuration")
+
+        api_url = st.text_input(
+            "API Server URL",
+            value=default_api_url,
+            help=api_url_help
+        ).rstrip('/')
+
+        st.markdown("---")
+        st.markdown(f"### {guide_title}")
+        st.markdown(guide_markdown)
+
+    client = get_chat_client(api_url, health_timeout, offline_message)
+
+    # Health status comes from the client's cache; a stale entry is refreshed in the background
+    health_status, health_message = client.health()
+    if health_status:
+        st.sidebar.success(health_message)
+    else:
+        st.sidebar.error(health_message)
+
+    # Initialize chat history (only a recent window lives in session state;
+    # the full transcript is kept per session by the API)
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    if "messages" not in st.session_state:
+        _reset_history()
+
+    # Display chat messages - SIMPLE VERSION WITHOUT COLORS
+    st.markdown("### 💬 Conversation")
+
+    # Older messages are fetched page by page on demand
+    if st.session_state.has_older and st.button("⬆️ Load older messages"):
+        _load_older(client)
+
+    # Show the recent window of messages
+    for message in st.session_state.messages:
+        _render_message(message)
+
+    # New messages are written here directly, without a full rerun
+    new_messages = st.container()
+
+    # Show empty state if no messages
+    empty_state = st.empty()
+    if not st.session_state.messages:
+        empty_state.info("💡 Start a conversation by typing a message below!")
+
+    # Chat input
+    with st.form("chat_form", clear_on_submit=True):
+        user_input = st.text_input("Your message:", placeholder="Ask me anything about AI, machine learning, etc...", key="chat_input")
+        submitted = st.form_submit_button("🚀 Send Message")
+
+    if submitted and user_input:
+        user_message = {"role": "user", "content": user_input}
+        empty_state.empty()
+        with new_messages:
+            _render_message(user_message)
+
+            # Get bot response
+            try:
+                with st.spinner("🤔 Thinking..."):
+                    response = client.chat(
+                        user_input,
+                        use_history=True,
+                        session_id=st.session_state.client_id
+                    )
+
+                if response.status_code == 200:
+                    data = response.json()
+                    if data["success"]:
+                        # Add bot response to chat history
+                        assistant_message = {
+                            "role": "assistant",
+                            "content": data["answer"],
+                            "sources": data.get("sources_count", 0)
+                        }
+                        _render_message(assistant_message)
+                        _append_to_window(user_message, assistant_message)
+                    else:
+                        st.error(f"❌ API Error: {data['answer']}")
+
+                elif response.status_code in (429, 503):
+                    retry_after = response.headers.get("Retry-After", "a few")
+                    st.error(f"⏳ Server is busy, please retry in {retry_after} seconds")
+
+                else:
+                    st.error(f"❌ HTTP Error: {response.status_code}")
+
+            except requests.exceptions.RequestException as e:
+                st.error(f"❌ Connection error: {str(e)}")
+
+    # Clear chat button
+    if st.sidebar.button("🗑️ Clear Chat History"):
+        try:
+            client.clear_history(st.session_state.client_id)
+        except requests.exceptions.RequestException:
+            pass
+        _reset_history()
+        st.rerun()
+
+    # Manual health check button
+    if st.sidebar.button("🩺 Check API Health"):
+        health_status, health_message = client.check_health()
+        if health_status:
+            st.sidebar.success(health_message)
+        else:
+            st.sidebar.error(health_message)
@@ -0,0 +1,104 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class ChatAPIClient:
+    """HTTP client for the chat API shared by the Streamlit frontends.
+
+    One pooled keep-alive session is reused for every request, and the API
+    health status is cached; once it is older than health_ttl, the next read
+    returns it and starts a one-off refresh in the background, so a script
+    rerun never blocks on a health round trip or a new TLS handshake, and an
+    unused client does no polling.
+    """
+
+    def __init__(self, api_url: str, health_timeout: float = 5, health_ttl: float = 15,
+                 request_timeout: float = 60, offline_message: str = "❌ API server is not running."):
+        self.api_url = api_url.rstrip('/')
+        self.health_timeout = health_timeout
+        self.health_ttl = health_ttl
+        self.request_timeout = request_timeout
+        self.offline_message = offline_message
+
+        self.session = requests.Session()
+        # Retry idempotent GETs only; POST /chat must not be replayed
+        retries = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 504], allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._health: Optional[Tuple[bool, str]] = None
+        self._health_checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def check_health(self) -> Tuple[bool, str]:
+        """Query /health now and update the cached status"""
+        try:
+            response = self.session.get(f"{self.api_url}/health", timeout=self.health_timeout)
+            status = (response.status_code == 200, "✅ API is running!")
+        except requests.exceptions.ConnectionError:
+            status = (False, self.offline_message)
+        except requests.exceptions.Timeout:
+            status = (False, "❌ Connection timed out. The API might be starting up.")
+        except Exception as e:
+            status = (False, f"❌ Error: {str(e)}")
+        with self._lock:
+            self._health = status
+            self._health_checked_at = time.time()
+        return status
+
+    def health(self) -> Tuple[bool, str]:
+        """Cached health status; only the very first call waits for a real check"""
+        with self._lock:
+            cached = self._health
+            stale = time.time() - self._health_checked_at >= self.health_ttl
+            refresh = cached is not None and stale and not self._refreshing
+            if refresh:
+                self._refreshing = True
+        if cached is None:
+            return self.check_health()
+        if refresh:
+            threading.Thread(target=self._refresh_health, daemon=True).start()
+        return cached
+
+    def _refresh_health(self):
+        try:
+            self.check_health()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def close(self):
+        self.session.close()
+
+    def chat(self, message: str, use_history: bool = True, **extra) -> requests.Response:
+        return self.session.post(
+            f"{self.api_url}/chat",
+            json={"message": message, "use_history": use_history, **extra},
+            timeout=self.request_timeout
+        )
+
+    def history(self, session_id: str, before: Optional[int] = None, limit: int = 20) -> Dict:
+        """One page of a session's transcript, newest first page by default"""
+        params = {"session_id": session_id, "limit": limit}
+        if before is not None:
+            params["before"] = before
+        return self.get_json("/conversation/history", **params)
+
+    def clear_history(self, session_id: str):
+        response = self.session.delete(
+            f"{self.api_url}/conversation/clear", params={"session_id": session_id},
+            timeout=self.health_timeout
+        )
+        response.raise_for_status()
+
+    def get_json(self, path: str, **params) -> Dict:
+        response = self.session.get(f"{self.api_url}{path}", params=params, timeout=self.health_timeout)
+        response.raise_for_status()
+        return response.json()
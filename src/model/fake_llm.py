@@ -0,0 +1,27 @@
+import os
+import random
+import time
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel used in load tests and local runs.
+
+    Enabled with LLM_BACKEND=fake. Latency is drawn from a normal distribution
+    (FAKE_LLM_LATENCY_MS / FAKE_LLM_JITTER_MS) so load tests see realistic
+    upstream service times without spending Gemini quota.
+    """
+
+    def __init__(self, latency_ms: float = None, jitter_ms: float = None):
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv('FAKE_LLM_LATENCY_MS', '800'))
+        self.jitter_ms = jitter_ms if jitter_ms is not None else float(os.getenv('FAKE_LLM_JITTER_MS', '200'))
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        delay = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        time.sleep(delay)
+        question = prompt.rsplit("Question:", 1)[-1].split("\n", 1)[0].strip()
+        return FakeResponse(f"[fake answer] {question}")
@@ -3,23 +3,57 @@ from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 import os
 import sys
+import threading
+import time
+import hashlib
 import logging
+import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 # Add config to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
+from src.model.single_flight import SingleFlight
+from src.model.partitions import Filters, PartitionedIndex, load_partitions, partitions_from_vector_db
+from src.model.shared_cache import RAGCache, get_default_cache
+from src.model.sharded_index import SHARDS_FILE, ShardedIndex
+from src.model.query_router import CHAT, RAG, TEMPLATE, QueryRouter
+
 logger = logging.getLogger(__name__)
 
+def normalize_question(question: str) -> str:
+    """Canonical form used to detect identical questions"""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+def filter_key(filters: Optional[Filters]) -> Tuple:
+    """Order-independent, hashable form of retrieval filters"""
+    return tuple(sorted((k, str(sorted(v) if isinstance(v, (list, tuple)) else v))
+                        for k, v in (filters or {}).items()))
+
+def create_embeddings() -> HuggingFaceEmbeddings:
+    """The MiniLM embedding model all indexes are built with"""
+    return HuggingFaceEmbeddings(
+        model_name="sentence-transformers/all-MiniLM-L6-v2"
+    )
+
 class GeminiRAGSystem:
-    def __init__(self, vector_db_path: str = None, use_small_model: bool = None):
+    def __init__(self, vector_db_path: str = None, use_small_model: bool = None,
+                 embeddings=None, model=None, cache: RAGCache = None,
+                 router: QueryRouter = None):
         """
         Initialize Gemini RAG System
         
         Args:
             vector_db_path: Custom path to vector database
             use_small_model: If True, use gemini-rag-small. If False, use gemini-rag.
+            embeddings: Embedding model to reuse (e.g. shared across indexes);
+                a MiniLM instance is created when omitted
+            model: Generation model to reuse; initialized from config when omitted
+            cache: Cache for query embeddings, retrieval results and answers;
+                defaults to the process-wide cache configured by CACHE_BACKEND
+            router: Routes small talk past retrieval and drops weak chunks;
+                configured from ROUTER_* environment variables when omitted
         """
         # Determine which model to use
         if use_small_model is None:
@@ -60,15 +94,61 @@ class GeminiRAGSystem:
         else:
             self.vector_db_path = Path(vector_db_path)
         
-        # Load vector database
-        self.vector_db = self._load_vector_db()
-        self.retriever = self.vector_db.as_retriever(search_kwargs={"k": 3})
-        self.model = self._initialize_gemini()
+        # Load vector database (or start shard workers for a sharded index)
+        self.sharded_index = None
+        if self._use_shards():
+            self.embeddings = embeddings or create_embeddings()
+            self.sharded_index = ShardedIndex(str(self.vector_db_path))
+            self.vector_db = self.retriever = self.partitioned_index = None
+        else:
+            self.vector_db = self._load_vector_db(embeddings)
+            self.embeddings = self.vector_db.embedding_function
+            self.retriever = self.vector_db.as_retriever(search_kwargs={"k": 3})
+            self.partitioned_index = self._load_partitions()
+        self.model = model or self._initialize_gemini()
         self.conversation_history: List[Tuple[str, str]] = []
+        # Requests without a session share it from threadpool threads
+        self._history_lock = threading.Lock()
+        self.index_version = self._compute_index_version()
+        self.single_flight = SingleFlight()
+        self.cache = cache if cache is not None else get_default_cache()
+        self.router = router if router is not None else QueryRouter.from_env(self._embed_query)
+        if self.router.min_similarity is not None:
+            self.router.require_unit_l2(self._index_is_unit_l2(), str(self.vector_db_path))
         
         logger.info("Gemini RAG System initialized successfully!")
 
-    def _load_vector_db(self) -> FAISS:
+    def _use_shards(self) -> bool:
+        """Serve from shards when only they were saved, or when RAG_USE_SHARDS=1"""
+        if not (self.vector_db_path / SHARDS_FILE).exists():
+            return False
+        return os.getenv('RAG_USE_SHARDS') == '1' or not (self.vector_db_path / 'index.faiss').exists()
+
+    def _index_is_unit_l2(self, sample_size: int = 100) -> bool:
+        """Whether the index is L2 over unit-norm vectors (checked on a sample)"""
+        if self.sharded_index is not None:
+            manifest = self.sharded_index.manifest
+            return manifest.get('metric') == 'l2' and manifest.get('normalized') is True
+        import faiss
+        index = self.vector_db.index
+        if index.metric_type != faiss.METRIC_L2 or index.ntotal == 0:
+            return False
+        try:
+            sample = index.reconstruct_n(0, min(sample_size, index.ntotal))
+        except RuntimeError:
+            return False  # Index type without reconstruct()
+        return bool(np.allclose(np.linalg.norm(sample, axis=1), 1.0, atol=1e-2))
+
+    def _compute_index_version(self) -> str:
+        """Identify the loaded index by its files' size and mtime"""
+        parts = []
+        names = (SHARDS_FILE,) if self.sharded_index else ('index.faiss', 'index.pkl')
+        for name in names:
+            stat = (self.vector_db_path / name).stat()
+            parts.append(f"{name}:{stat.st_size}:{int(stat.st_mtime)}")
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+    def _load_vector_db(self, embeddings=None) -> FAISS:
         """Load FAISS vector database"""
         logger.info(f"🔍 Looking for vector database at: {self.vector_db_path}")
         
@@ -87,9 +167,8 @@ class GeminiRAGSystem:
             raise FileNotFoundError(f"Missing vector database files: {missing_files}")
         
         try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2"
-            )
+            if embeddings is None:
+                embeddings = create_embeddings()
             
             # Load with dangerous deserialization allowed
             vector_db = FAISS.load_local(
@@ -102,8 +181,21 @@ class GeminiRAGSystem:
         except Exception as e:
             raise Exception(f"Failed to load vector database: {str(e)}")
 
+    def _load_partitions(self) -> PartitionedIndex:
+        """Metadata partitions saved with the index, or derived from the docstore"""
+        partitions = load_partitions(self.vector_db_path)
+        if partitions is None:
+            logger.info("partitions.json not found, deriving partitions from docstore")
+            partitions = partitions_from_vector_db(self.vector_db, keys=('category', 'source'))
+        return PartitionedIndex(self.vector_db.index, partitions)
+
     def _initialize_gemini(self):
         """Initialize Gemini model using config/api_keys.py"""
+        if os.getenv('LLM_BACKEND') == 'fake':
+            from src.model.fake_llm import FakeGenerativeModel
+            logger.info("🧪 Using fake LLM backend (LLM_BACKEND=fake)")
+            return FakeGenerativeModel()
+        
         try:
             # Import API key from your config file
             try:
@@ -128,21 +220,79 @@ class GeminiRAGSystem:
             logger.error(f"❌ Failed to initialize Gemini model: {str(e)}")
             raise
 
-    def ask_question(self, question: str, use_history: bool = True) -> Dict:
-        """Ask question with RAG context"""
-        try:
-            # Get relevant context
-            docs = self.retriever.invoke(question)
-            context = "\n\n".join([doc.page_content for doc in docs])
-            
-            # Build prompt with history
-            history_text = ""
-            if use_history and self.conversation_history:
-                history_text = "\nPrevious conversation:\n"
-                for q, a in self.conversation_history[-3:]:  # Last 3 exchanges
-                    history_text += f"User: {q}\nAssistant: {a}\n"
-            
-            prompt = f"""Based on the following context, provide a helpful answer.
+    def retrieve(self, question: str, k: int = None, filters: Optional[Filters] = None,
+                 query_vector=None) -> List:
+        """Retrieve the top-k documents for a question.
+        
+        ``filters`` (e.g. {"category": "ML"} or {"source": ["a", "b"]}) restricts
+        the search to matching metadata partitions instead of the whole index.
+        Documents less similar than the router's min_similarity are dropped.
+        ``query_vector`` reuses an embedding already computed for the question.
+        """
+        if query_vector is None and (self.sharded_index is not None or filters
+                                     or self.router.min_similarity is not None):
+            query_vector = self._embed_query(question)
+        if self.sharded_index is not None:
+            hits = self.sharded_index.search(query_vector, k or 3, filters)
+            return self.router.filter_chunks([hit.score for hit in hits], hits)
+        if self.cache is not None:
+            return self._cached_retrieve(question, k or 3, filters, query_vector)
+        if query_vector is not None:
+            distances, positions = self.partitioned_index.search(query_vector, k or 3, filters)
+            return self._docs_at(self.router.filter_chunks(distances, positions))
+        if k is None:
+            return self.retriever.invoke(question)
+        return self.vector_db.similarity_search(question, k=k)
+
+    def _embed_query(self, question: str):
+        embedding_function = self.embeddings
+        if self.cache is None:
+            return embedding_function.embed_query(question)
+        model_name = getattr(embedding_function, 'model_name', 'embeddings')
+        vector = self.cache.get_embedding(model_name, question)
+        if vector is None:
+            vector = embedding_function.embed_query(question)
+            self.cache.put_embedding(model_name, question, vector)
+        return vector
+
+    def _docs_at(self, positions) -> List:
+        return [self.vector_db.docstore.search(self.vector_db.index_to_docstore_id[int(p)])
+                for p in positions if p >= 0]
+
+    def _cached_retrieve(self, question: str, k: int, filters: Optional[Filters],
+                         query_vector=None) -> List:
+        """Retrieval through the shared cache: positions first, then the query embedding"""
+        # Cached positions are after the similarity threshold, so it is part of the key
+        key_filters = (filter_key(filters), self.router.min_similarity)
+        positions = self.cache.get_retrieval(self.index_version, question, k, key_filters)
+        if positions is None:
+            if query_vector is None:
+                query_vector = self._embed_query(question)
+            distances, found = self.partitioned_index.search(query_vector, k, filters)
+            positions = [int(p) for p in self.router.filter_chunks(distances, found) if p >= 0]
+            self.cache.put_retrieval(self.index_version, question, k, key_filters, positions)
+        return self._docs_at(positions)
+
+    def build_prompt(self, question: str, docs: List, use_history: bool = True,
+                     history: List[Tuple[str, str]] = None) -> str:
+        """Build the RAG prompt from retrieved documents and recent history"""
+        context = "\n\n".join([doc.page_content for doc in docs])
+        turns = self.history() if history is None else history
+        
+        # Build prompt with history
+        history_text = ""
+        if use_history and turns:
+            history_text = "\nPrevious conversation:\n"
+            for q, a in turns[-3:]:  # Last 3 exchanges
+                history_text += f"User: {q}\nAssistant: {a}\n"
+        
+        if not docs:
+            # Small talk, or nothing retrieved was relevant: skip the empty context block
+            return f"""Reply helpfully and concisely to the user.
+{history_text}
+User: {question}"""
+        
+        return f"""Based on the following context, provide a helpful answer.
 
 Context: {context}
 {history_text}
@@ -150,19 +300,88 @@ Question: {question}
 
 Please provide a clear and accurate response:"""
 
+    def ask_question(self, question: str, use_history: bool = True,
+                     history: List[Tuple[str, str]] = None,
+                     filters: Optional[Filters] = None) -> Dict:
+        """Ask question with RAG context.
+        
+        Args:
+            question: User question
+            use_history: Include recent exchanges in the prompt
+            history: Caller-managed (e.g. per-session) exchanges to use instead of
+                the shared conversation_history; it is not modified here
+            filters: Metadata filters applied before retrieval (see retrieve)
+        
+        The router first picks a route: template replies for greetings and the
+        like, no retrieval for other small talk, full RAG otherwise.
+        History-independent requests for the same normalized question and index
+        version are served from the answer cache when enabled, and otherwise
+        coalesced: concurrent followers share the leader's answer.
+        """
+        start = time.perf_counter()
+        try:
+            route, reply, query_vector = self.router.route(question)
+        except Exception as e:
+            logger.warning(f"Query routing failed, using RAG: {e}")
+            route, reply, query_vector = RAG, None, None
+        if route == TEMPLATE:
+            self._remember(question, reply, use_history, history)
+            result = {'success': True, 'answer': reply, 'sources_count': 0, 'prompt_chars': 0, 'timings': {}}
+        else:
+            result = self._answer(question, use_history, history, filters, route, query_vector)
+        self.router.record(route, time.perf_counter() - start, result.get('timings'))
+        return dict(result, route=route)
+
+    def _answer(self, question: str, use_history: bool, history: List[Tuple[str, str]],
+                filters: Optional[Filters], route: str, query_vector) -> Dict:
+        if use_history and (history is None or history):
+            return self._ask(question, use_history, history, filters, route, query_vector)
+        
+        normalized = normalize_question(question)
+        # Everything besides the question and index that changes the answer
+        generation_model = getattr(self.model, 'model_name', type(self.model).__name__)
+        key_filters = (filter_key(filters), self.router.min_similarity, self.use_small_model, generation_model)
+        if self.cache is not None:
+            cached = self.cache.get_answer(self.index_version, normalized, key_filters)
+            if cached is not None:
+                return dict(cached, success=True, cache_hit=True, timings={})
+        
+        key = (self.index_version, normalized, key_filters)
+        result, shared = self.single_flight.do(
+            key, lambda: self._ask(question, False, history, filters, route, query_vector)
+        )
+        if shared:
+            result = dict(result, coalesced=True)
+        elif self.cache is not None and result['success']:
+            self.cache.put_answer(self.index_version, normalized, key_filters, result)
+        return result
+
+    def _ask(self, question: str, use_history: bool, history: List[Tuple[str, str]] = None,
+             filters: Optional[Filters] = None, route: str = RAG, query_vector=None) -> Dict:
+        timings = {}
+        try:
+            # Get relevant context (small talk goes without)
+            docs = []
+            if route != CHAT:
+                start = time.perf_counter()
+                docs = self.retrieve(question, filters=filters, query_vector=query_vector)
+                timings['retrieval'] = time.perf_counter() - start
+            
+            prompt = self.build_prompt(question, docs, use_history, history)
+
             # Generate response
+            start = time.perf_counter()
             response = self.model.generate_content(prompt)
+            timings['generation'] = time.perf_counter() - start
             
-            # Update conversation history
-            if use_history:
-                self.conversation_history.append((question, response.text))
-                if len(self.conversation_history) > 5:  # Keep last 5 exchanges
-                    self.conversation_history.pop(0)
+            self._remember(question, response.text, use_history, history)
             
             return {
                 'success': True,
                 'answer': response.text,
-                'sources_count': len(docs)
+                'sources_count': len(docs),
+                'prompt_chars': len(prompt),
+                'timings': timings
             }
             
         except Exception as e:
@@ -170,10 +389,30 @@ Please provide a clear and accurate response:"""
             return {
                 'success': False,
                 'answer': f"Error: {str(e)}",
-                'sources_count': 0
+                'sources_count': 0,
+                'timings': timings
             }
 
+    def _remember(self, question: str, answer: str, use_history: bool, history: List[Tuple[str, str]]):
+        """Update conversation history (callers passing history manage their own)"""
+        if use_history and history is None:
+            with self._history_lock:
+                self.conversation_history.append((question, answer))
+                if len(self.conversation_history) > 5:  # Keep last 5 exchanges
+                    self.conversation_history.pop(0)
+
+    def history(self) -> List[Tuple[str, str]]:
+        """Snapshot of the shared conversation history"""
+        with self._history_lock:
+            return list(self.conversation_history)
+
+    def close(self):
+        """Stop shard workers, if any"""
+        if self.sharded_index is not None:
+            self.sharded_index.close()
+
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history.clear()
+        with self._history_lock:
+            self.conversation_history.clear()
         logger.info("🗑️ Conversation history cleared")
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Registry of named vector indexes served side by side.
+
+Every index is a GeminiRAGSystem, but all of them share one embedding model
+and one generation model. Indexes load on first use and the least recently
+used ones are evicted when the estimated resident size exceeds the budget.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.model.sharded_index import SHARDS_FILE
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = Path(__file__).parent.parent.parent / "model"
+
+
+class UnknownIndexError(KeyError):
+    """Raised for an index name that is not registered"""
+
+
+def discover_indexes(model_dir: Path = MODEL_DIR) -> Dict[str, Path]:
+    """Every sub-directory of model/ holding a saved FAISS index or index shards"""
+    if not model_dir.exists():
+        return {}
+    return {
+        path.name: path for path in sorted(model_dir.iterdir())
+        if ((path / "index.faiss").exists() and (path / "index.pkl").exists())
+        or (path / SHARDS_FILE).exists()
+    }
+
+
+def parse_index_spec(spec: str) -> Dict[str, Path]:
+    """Parse "name=path,name2=path2" (as set in RAG_INDEXES)"""
+    indexes = {}
+    for item in spec.split(','):
+        if item.strip():
+            name, _, path = item.partition('=')
+            indexes[name.strip()] = Path(path.strip())
+    return indexes
+
+
+def estimate_index_bytes(path: Path, sharded: Optional[bool] = None) -> int:
+    """Resident size approximated by the saved index and docstore sizes.
+
+    Shard layouts (served when ``sharded``, or when there is no full index)
+    count every shard's index.faiss and docs.jsonl, held by the shard workers.
+    """
+    if sharded is None:
+        sharded = (path / SHARDS_FILE).exists() and not (path / "index.faiss").exists()
+    if sharded:
+        files = [f for shard in (path / "shards").glob("*") for f in (shard / "index.faiss", shard / "docs.jsonl")]
+    else:
+        files = [path / "index.faiss", path / "index.pkl"]
+    return sum(f.stat().st_size for f in files if f.exists())
+
+
+def _close(system):
+    close = getattr(system, 'close', None)
+    if close is not None:
+        try:
+            close()
+        except Exception as e:
+            logger.warning(f"Failed to close index at {getattr(system, 'vector_db_path', '?')}: {e}")
+
+
+class IndexRegistry:
+    def __init__(self, indexes: Dict[str, Path], default_index: str,
+                 system_factory: Callable, embeddings_factory: Callable,
+                 memory_budget_mb: float = 2048):
+        """
+        Args:
+            indexes: Index name -> directory with index.faiss/index.pkl
+            default_index: Name used when a request does not pick an index
+            system_factory: Builds a RAG system, e.g. GeminiRAGSystem
+            embeddings_factory: Builds the embedding model shared by all indexes
+            memory_budget_mb: Estimated size loaded indexes may occupy (0 = unlimited)
+        """
+        if default_index not in indexes:
+            raise UnknownIndexError(default_index)
+        self.indexes = indexes
+        self.default_index = default_index
+        self.system_factory = system_factory
+        self.embeddings_factory = embeddings_factory
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._embeddings = None
+        self._model = None
+        self._loaded: "OrderedDict[str, object]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in indexes}
+        self.counters = {'hits': 0, 'loads': 0, 'evictions': 0, 'load_seconds': 0.0}
+
+    @classmethod
+    def from_env(cls, system_factory: Callable, embeddings_factory: Callable,
+                 use_small_model: bool = False) -> "IndexRegistry":
+        """Indexes from RAG_INDEXES or auto-discovered under model/.
+
+        The default is RAG_DEFAULT_INDEX, else gemini-rag-small / gemini-rag
+        depending on ``use_small_model``, else the first index found.
+        """
+        spec = os.getenv('RAG_INDEXES')
+        indexes = parse_index_spec(spec) if spec else discover_indexes()
+        preferred = "gemini-rag-small" if use_small_model else "gemini-rag"
+        default_index = os.getenv('RAG_DEFAULT_INDEX') or (
+            preferred if preferred in indexes or not indexes else next(iter(indexes))
+        )
+        if default_index not in indexes:
+            # Keep GeminiRAGSystem's own path search for the default index
+            indexes[default_index] = None
+        return cls(
+            indexes, default_index, system_factory, embeddings_factory,
+            memory_budget_mb=float(os.getenv('RAG_INDEX_MEMORY_MB', '2048'))
+        )
+
+    @property
+    def embeddings(self):
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = self.embeddings_factory()
+            return self._embeddings
+
+    def peek(self, name: Optional[str] = None):
+        """The loaded system for ``name``, or None without loading it"""
+        return self._loaded.get(name or self.default_index)
+
+    def get(self, name: Optional[str] = None):
+        """Return the RAG system for ``name``, loading (and evicting) as needed"""
+        name = name or self.default_index
+        if name not in self.indexes:
+            raise UnknownIndexError(name)
+        with self._lock:
+            system = self._loaded.get(name)
+            if system is not None:
+                self._loaded.move_to_end(name)
+                self.counters['hits'] += 1
+                return system
+
+        # One loader per index; other indexes stay available meanwhile
+        with self._load_locks[name]:
+            with self._lock:
+                system = self._loaded.get(name)
+                if system is not None:
+                    self._loaded.move_to_end(name)
+                    self.counters['hits'] += 1
+                    return system
+            started = time.perf_counter()
+            path = self.indexes[name]
+            system = self.system_factory(
+                vector_db_path=str(path) if path else None,
+                embeddings=self.embeddings,
+                model=self._model,
+            )
+            elapsed = time.perf_counter() - started
+            logger.info(f"📦 Loaded index '{name}' in {elapsed:.2f}s")
+            with self._lock:
+                if self._model is None:
+                    self._model = system.model
+                self._loaded[name] = system
+                self._sizes[name] = estimate_index_bytes(
+                    Path(system.vector_db_path), getattr(system, 'sharded_index', None) is not None
+                )
+                self.counters['loads'] += 1
+                self.counters['load_seconds'] += elapsed
+                evicted = self._evict(keep=name)
+            # Outside the lock: closing waits for in-flight shard searches
+            for old in evicted:
+                _close(old)
+            return system
+
+    def _evict(self, keep: str) -> List:
+        """Drop least recently used indexes until within budget (caller holds the lock).
+
+        Returns the evicted systems for the caller to close. In-flight requests
+        keep their own reference; closing a sharded system waits for the shard
+        searches already running.
+        """
+        evicted = []
+        if not self.memory_budget:
+            return evicted
+        while sum(self._sizes.values()) > self.memory_budget and len(self._loaded) > 1:
+            name = next(n for n in self._loaded if n != keep)
+            evicted.append(self._loaded.pop(name))
+            self._sizes.pop(name, None)
+            self.counters['evictions'] += 1
+            logger.info(f"♻️ Evicted index '{name}' to stay within the memory budget")
+        return evicted
+
+    def close(self):
+        """Close every loaded system (stops shard workers), e.g. on shutdown"""
+        with self._lock:
+            systems = list(self._loaded.values())
+            self._loaded.clear()
+            self._sizes.clear()
+        for system in systems:
+            _close(system)
+
+    def stats(self) -> Dict:
+        return {
+            'default_index': self.default_index,
+            'available': sorted(self.indexes),
+            'loaded': {name: self._sizes.get(name, 0) for name in self._loaded},
+            'loaded_bytes': sum(self._sizes.values()),
+            'memory_budget_bytes': self.memory_budget,
+            **self.counters,
+        }
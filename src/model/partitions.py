@@ -0,0 +1,160 @@
+"""
+Metadata partitions over a FAISS index.
+
+The index build records, for every metadata key/value (e.g. category=ML or
+source=conversation_data), the FAISS positions of the matching vectors. A
+filtered search then only scans that partition: a single key/value is served
+from a lazily built flat sub-index, and combined filters use an ID selector on
+the main index.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+PARTITIONS_FILE = "partitions.json"
+# Bump when build_partitions changes which values it records (v2: numeric values),
+# so built indexes get fresh partitions
+PARTITIONS_VERSION = 2
+
+Filters = Dict[str, Union[str, Sequence[str]]]
+Partitions = Dict[str, Dict[str, List[int]]]
+
+
+def partition_value(value) -> Optional[str]:
+    """String form of a scalar metadata or filter value, None for anything else.
+
+    numpy scalars (pandas rows) are unwrapped, and whole floats match their
+    integer form, since a numeric CSV column with gaps is read as float.
+    """
+    value = getattr(value, 'item', lambda: value)()
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        if value.is_integer():
+            value = int(value)
+    if isinstance(value, (str, int, bool, float)):
+        return str(value)
+    return None
+
+
+def build_partitions(metadatas: Sequence[Dict], keys: Optional[Sequence[str]] = None) -> Partitions:
+    """Map metadata key -> value -> FAISS positions, for scalar metadata values"""
+    partitions: Partitions = {}
+    for position, metadata in enumerate(metadatas):
+        for key, value in (metadata or {}).items():
+            if keys is not None and key not in keys:
+                continue
+            value = partition_value(value)
+            if value is not None:
+                partitions.setdefault(key, {}).setdefault(value, []).append(position)
+    return partitions
+
+
+def partitions_from_vector_db(vector_db, keys: Optional[Sequence[str]] = None) -> Partitions:
+    """Derive partitions from a LangChain FAISS store's docstore"""
+    metadatas = []
+    for position in range(vector_db.index.ntotal):
+        doc = vector_db.docstore.search(vector_db.index_to_docstore_id[position])
+        metadatas.append(getattr(doc, 'metadata', {}) or {})
+    return build_partitions(metadatas, keys)
+
+
+def save_partitions(directory: str, partitions: Partitions):
+    with open(Path(directory) / PARTITIONS_FILE, 'w') as f:
+        json.dump(partitions, f)
+
+
+def load_partitions(directory: str) -> Optional[Partitions]:
+    path = Path(directory) / PARTITIONS_FILE
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class PartitionedIndex:
+    """Filtered top-k search that only scans the matching partition"""
+
+    def __init__(self, index, partitions: Partitions):
+        self.index = index
+        self.partitions = partitions
+        self._sub_indexes: Dict[Tuple[str, str], Tuple[object, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {key: {value: len(ids) for value, ids in values.items()}
+                for key, values in self.partitions.items()}
+
+    def candidate_ids(self, filters: Filters) -> np.ndarray:
+        """Positions matching every filter key (any of the listed values per key)"""
+        result = None
+        for key, values in filters.items():
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            partition = self.partitions.get(key, {})
+            ids = [np.asarray(partition.get(partition_value(v), []), dtype=np.int64) for v in values]
+            key_ids = np.unique(np.concatenate(ids)) if ids else np.empty(0, dtype=np.int64)
+            result = key_ids if result is None else np.intersect1d(result, key_ids, assume_unique=True)
+        return result if result is not None else np.empty(0, dtype=np.int64)
+
+    def _single_partition(self, filters: Filters) -> Optional[Tuple[str, str]]:
+        if len(filters) != 1:
+            return None
+        key, values = next(iter(filters.items()))
+        if isinstance(values, (list, tuple)):
+            if len(values) != 1:
+                return None
+            values = values[0]
+        return key, partition_value(values)
+
+    def _sub_index(self, key: str, value: str):
+        """Flat index over one partition's vectors, built on first use"""
+        with self._lock:
+            cached = self._sub_indexes.get((key, value))
+            if cached is not None:
+                return cached
+            import faiss
+
+            ids = np.asarray(self.partitions.get(key, {}).get(value, []), dtype=np.int64)
+            vectors = np.vstack([self.index.reconstruct(int(i)) for i in ids]) if len(ids) else \
+                np.empty((0, self.index.d), dtype=np.float32)
+            if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                sub_index = faiss.IndexFlatIP(self.index.d)
+            else:
+                sub_index = faiss.IndexFlatL2(self.index.d)
+            sub_index.add(vectors.astype(np.float32))
+            self._sub_indexes[(key, value)] = (sub_index, ids)
+            return sub_index, ids
+
+    def search(self, query: np.ndarray, k: int, filters: Optional[Filters] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (distances, positions) for one query vector, restricted to ``filters``"""
+        query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        if not filters:
+            distances, ids = self.index.search(query, k)
+            return distances[0], ids[0]
+
+        single = self._single_partition(filters)
+        if single is not None:
+            try:
+                sub_index, ids = self._sub_index(*single)
+            except RuntimeError:
+                # Index type without reconstruct(): fall back to an ID selector
+                sub_index = None
+            if sub_index is not None:
+                if sub_index.ntotal == 0:
+                    return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+                distances, local = sub_index.search(query, min(k, sub_index.ntotal))
+                return distances[0], ids[local[0]]
+
+        import faiss
+
+        candidates = self.candidate_ids(filters)
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(candidates))
+        distances, ids = self.index.search(query, min(k, len(candidates)), params=params)
+        keep = ids[0] >= 0
+        return distances[0][keep], ids[0][keep]
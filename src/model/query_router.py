@@ -0,0 +1,179 @@
+"""
+Pre-retrieval query routing.
+
+Every message used to go through embedding, FAISS search and a context-stuffed
+prompt. The router sends each question down the cheapest route that can
+answer it:
+
+- template: greetings, thanks, goodbyes and "how are you" matched by rules are
+  answered from canned replies (no embedding, retrieval or LLM call)
+- chat: other short small talk, detected by the query embedding's similarity
+  to a centroid of small-talk examples, goes to the LLM without retrieval
+- rag: everything else; with ROUTER_MIN_SIMILARITY set, retrieved chunks less
+  similar than it are dropped instead of always passing k of them (only for
+  L2 indexes of unit-norm vectors, where distance maps to cosine similarity)
+
+Per-route counts and latencies, and the latency saved versus the rag route,
+are reported by stats().
+"""
+import logging
+import os
+import re
+import threading
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from src.MLOps.monitoring.sketches import LogHistogram
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE, CHAT, RAG = 'template', 'chat', 'rag'
+ROUTES = (TEMPLATE, CHAT, RAG)
+
+# (pattern, reply) checked in order against the whole normalized message
+TEMPLATES = [
+    (r"(hi|hello|hey|hiya|howdy|yo|greetings)( there)?|good (morning|afternoon|evening)",
+     "Hi! How can I help you today?"),
+    (r"(how are you|how are you doing|how's it going|how is it going|what's up|whats up|sup)( today)?",
+     "I'm doing well, thanks for asking! What would you like to talk about?"),
+    (r"(thanks|thank you|thx|ty|cheers)( (so|very) much| a lot)?",
+     "You're welcome! Let me know if there's anything else I can help with."),
+    (r"(bye|goodbye|see you|see ya|good night|later)",
+     "Goodbye! Feel free to come back any time."),
+    (r"(ok|okay|cool|great|nice|awesome|got it)",
+     "Great! Is there anything else you'd like to know?"),
+]
+
+SMALL_TALK_EXAMPLES = [
+    "hi how is your day going", "nice to meet you", "what's your name", "are you a bot",
+    "tell me about yourself", "that's funny", "i'm bored", "have a nice day",
+    "good to see you again", "i'm fine thanks and you", "you are very helpful", "lol",
+    "what are you up to", "sounds good to me", "i'm doing great today", "sorry about that",
+]
+
+
+def l2_to_cosine(distance: float) -> float:
+    """Cosine similarity from a squared L2 distance between unit vectors"""
+    return 1.0 - distance / 2.0
+
+
+class QueryRouter:
+    def __init__(self, embed: Optional[Callable] = None, min_similarity: Optional[float] = None,
+                 small_talk_threshold: float = 0.6, max_small_talk_words: int = 8,
+                 use_templates: bool = True):
+        """
+        Args:
+            embed: Query embedding function; the centroid check is skipped without it
+            min_similarity: Cosine similarity below which retrieved chunks are dropped
+                (None keeps all k)
+            small_talk_threshold: Similarity to the small-talk centroid that routes to chat
+            max_small_talk_words: Longer messages are never treated as small talk
+            use_templates: Answer rule matches from TEMPLATES
+        """
+        self.embed = embed
+        self.min_similarity = min_similarity
+        self.small_talk_threshold = small_talk_threshold
+        self.max_small_talk_words = max_small_talk_words
+        self.use_templates = use_templates
+        self._templates = [(re.compile(pattern), reply) for pattern, reply in TEMPLATES]
+        self._centroid = None
+        self._centroid_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.latency = {route: LogHistogram() for route in ROUTES}
+        self.counters = {'chunks_kept': 0, 'chunks_dropped': 0, 'retrieval_seconds': 0.0,
+                         'generation_seconds': 0.0, 'timed_rag_calls': 0}
+
+    @classmethod
+    def from_env(cls, embed: Optional[Callable] = None) -> "QueryRouter":
+        min_similarity = os.getenv('ROUTER_MIN_SIMILARITY')  # Unset: keep all k chunks
+        return cls(
+            embed=embed if os.getenv('ROUTER_SMALL_TALK_CHECK', '1') == '1' else None,
+            min_similarity=float(min_similarity) if min_similarity else None,
+            small_talk_threshold=float(os.getenv('ROUTER_SMALL_TALK_THRESHOLD', '0.6')),
+            max_small_talk_words=int(os.getenv('ROUTER_SMALL_TALK_WORDS', '8')),
+            use_templates=os.getenv('ROUTER_TEMPLATES', '1') == '1',
+        )
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        return re.sub(r"[^a-z' ]", '', " ".join(question.lower().split())).strip()
+
+    def template_reply(self, question: str) -> Optional[str]:
+        if not self.use_templates:
+            return None
+        text = self.normalize(question)
+        for pattern, reply in self._templates:
+            if pattern.fullmatch(text):
+                return reply
+        return None
+
+    def _small_talk_centroid(self) -> np.ndarray:
+        with self._centroid_lock:
+            if self._centroid is None:
+                vectors = np.asarray([self.embed(text) for text in SMALL_TALK_EXAMPLES], dtype=np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                centroid = vectors.mean(axis=0)
+                self._centroid = centroid / np.linalg.norm(centroid)
+            return self._centroid
+
+    def route(self, question: str):
+        """Return (route, template reply or None, query vector or None).
+
+        The query vector is computed only for the centroid check and can be
+        reused for retrieval.
+        """
+        reply = self.template_reply(question)
+        if reply is not None:
+            return TEMPLATE, reply, None
+        if self.embed is None or len(question.split()) > self.max_small_talk_words:
+            return RAG, None, None
+        vector = np.asarray(self.embed(question), dtype=np.float32)
+        similarity = float(vector @ self._small_talk_centroid() / (np.linalg.norm(vector) or 1.0))
+        return (CHAT if similarity >= self.small_talk_threshold else RAG), None, vector
+
+    def require_unit_l2(self, is_unit_l2: bool, index_description: str = "the index"):
+        """Turn chunk filtering off unless distances are squared L2 between unit vectors"""
+        if self.min_similarity is not None and not is_unit_l2:
+            logger.warning(f"ROUTER_MIN_SIMILARITY ignored: {index_description} is not an L2 index "
+                           "of normalized embeddings, so distances don't map to cosine similarity")
+            self.min_similarity = None
+
+    def keep(self, distance: float) -> bool:
+        """Whether a chunk at this squared L2 distance passes the similarity threshold"""
+        return self.min_similarity is None or l2_to_cosine(distance) >= self.min_similarity
+
+    def filter_chunks(self, distances, items) -> list:
+        """Items whose squared L2 distance passes the similarity threshold"""
+        kept = [item for distance, item in zip(distances, items) if self.keep(float(distance))]
+        with self._lock:
+            self.counters['chunks_kept'] += len(kept)
+            self.counters['chunks_dropped'] += len(items) - len(kept)
+        return kept
+
+    def record(self, route: str, seconds: float, timings: Optional[Dict] = None):
+        with self._lock:
+            self.latency[route].add(seconds)
+            if route == RAG and timings and 'retrieval' in timings and 'generation' in timings:
+                self.counters['retrieval_seconds'] += timings['retrieval']
+                self.counters['generation_seconds'] += timings['generation']
+                self.counters['timed_rag_calls'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = self.counters['timed_rag_calls']
+            retrieval = self.counters['retrieval_seconds'] / calls if calls else 0.0
+            generation = self.counters['generation_seconds'] / calls if calls else 0.0
+            routes = {route: self.latency[route].summary() for route in ROUTES}
+            # Versus sending the same messages down the rag route, at its average stage times
+            saved = (self.latency[TEMPLATE].count * (retrieval + generation)
+                     + self.latency[CHAT].count * retrieval)
+            return {
+                'routes': routes,
+                'counts': {route: summary['count'] for route, summary in routes.items()},
+                'chunks_kept': self.counters['chunks_kept'],
+                'chunks_dropped': self.counters['chunks_dropped'],
+                'avg_rag_retrieval_seconds': retrieval,
+                'avg_rag_generation_seconds': generation,
+                'estimated_seconds_saved': saved,
+            }
@@ -0,0 +1,183 @@
+"""
+Sharded vector search with scatter-gather across worker processes.
+
+The training pipeline writes N shards (a FAISS index plus its documents each)
+and a shards.json manifest. ShardedIndex starts one worker process per shard,
+sends every query to all of them in parallel, and merges the per-shard top-k
+by distance, so no single process holds the whole index. Metadata filters are
+applied inside each shard with its own partitions.
+"""
+import json
+import logging
+import multiprocessing as mp
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from heapq import nsmallest
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from src.MLOps.monitoring.sketches import LogHistogram
+from src.model.partitions import Filters, PartitionedIndex, build_partitions
+
+logger = logging.getLogger(__name__)
+
+SHARDS_FILE = "shards.json"
+
+
+class ShardHit(NamedTuple):
+    """A retrieved document; exposes page_content/metadata like a LangChain Document"""
+    page_content: str
+    metadata: Dict
+    score: float
+    shard: int
+
+
+def _json_default(value):
+    """numpy/pandas scalars in chunk metadata (e.g. from numeric CSV columns)"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def remove_shards(output_dir: str):
+    """Delete a previously written shard layout, so it can't be served after a rebuild"""
+    manifest = Path(output_dir) / SHARDS_FILE
+    if manifest.exists():
+        manifest.unlink()
+    shutil.rmtree(Path(output_dir) / "shards", ignore_errors=True)
+
+
+def write_shards(output_dir: str, vectors: np.ndarray, texts: Sequence[str],
+                 metadatas: Sequence[Dict], num_shards: int, embedding_model: str = None) -> Dict:
+    """Split vectors/documents round-robin into ``num_shards`` shards under output_dir/shards"""
+    import faiss
+
+    remove_shards(output_dir)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    shards_dir = Path(output_dir) / "shards"
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    norms = np.linalg.norm(vectors, axis=1)
+    manifest = {'num_shards': num_shards, 'dim': int(vectors.shape[1]), 'total': len(texts),
+                'embedding_model': embedding_model, 'metric': 'l2',
+                'normalized': bool(len(norms)) and bool(np.allclose(norms, 1.0, atol=1e-3)),
+                'shards': []}
+    for shard in range(num_shards):
+        positions = np.arange(shard, len(texts), num_shards)
+        path = shards_dir / f"shard-{shard:03d}"
+        path.mkdir(exist_ok=True)
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors[positions])
+        faiss.write_index(index, str(path / "index.faiss"))
+        with open(path / "docs.jsonl", 'w') as f:
+            for position in positions:
+                doc = {'page_content': texts[position], 'metadata': metadatas[position]}
+                f.write(json.dumps(doc, default=_json_default) + '\n')
+        manifest['shards'].append({'path': f"shards/shard-{shard:03d}", 'count': len(positions)})
+    with open(Path(output_dir) / SHARDS_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _shard_worker(path: str, conn, threads: int):
+    """Serve searches over one shard until told to stop"""
+    import faiss
+
+    faiss.omp_set_num_threads(threads)  # Shards share the cores instead of each using all of them
+    index = faiss.read_index(os.path.join(path, "index.faiss"))
+    with open(os.path.join(path, "docs.jsonl")) as f:
+        docs = [json.loads(line) for line in f]
+    partitioned = PartitionedIndex(index, build_partitions([d['metadata'] for d in docs]))
+    conn.send('ready')
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        query, k, filters = message
+        start = time.perf_counter()
+        distances, ids = partitioned.search(query, k, filters)
+        hits = [(float(d), docs[int(i)]['page_content'], docs[int(i)]['metadata'])
+                for d, i in zip(distances, ids) if i >= 0]
+        conn.send((hits, time.perf_counter() - start))
+
+
+class _Shard:
+    def __init__(self, number: int, path: str, context, threads: int):
+        self.number = number
+        self.lock = threading.Lock()
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_shard_worker, args=(path, child, threads), daemon=True,
+                                       name=f"shard-{number}")
+        self.process.start()
+        self.search_time = LogHistogram(min_value=1e-6)
+        self.round_trip = LogHistogram(min_value=1e-6)
+
+    def search(self, query: np.ndarray, k: int, filters: Optional[Filters]):
+        start = time.perf_counter()
+        with self.lock:
+            self.conn.send((query, k, filters))
+            hits, elapsed = self.conn.recv()
+            self.search_time.add(elapsed)
+            self.round_trip.add(time.perf_counter() - start)
+        return [ShardHit(text, metadata, distance, self.number) for distance, text, metadata in hits]
+
+
+class ShardedIndex:
+    """Scatter a query to every shard process and merge the top-k by distance"""
+
+    def __init__(self, index_dir: str, start_method: str = 'spawn'):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / SHARDS_FILE) as f:
+            self.manifest = json.load(f)
+        context = mp.get_context(start_method)
+        threads = max(1, (os.cpu_count() or 1) // len(self.manifest['shards']))
+        self.shards = [_Shard(i, str(self.index_dir / shard['path']), context, threads)
+                       for i, shard in enumerate(self.manifest['shards'])]
+        for shard in self.shards:
+            shard.conn.recv()  # Wait until the shard has loaded
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="shard-gather")
+        self.latency = LogHistogram(min_value=1e-6)
+        self._latency_lock = threading.Lock()
+        self.closed = False
+        logger.info(f"✅ Started {len(self.shards)} shard workers for {self.manifest['total']} vectors")
+
+    def search(self, query, k: int = 3, filters: Optional[Filters] = None) -> List[ShardHit]:
+        if self.closed:
+            raise RuntimeError("Sharded index is closed")
+        start = time.perf_counter()
+        query = np.asarray(query, dtype=np.float32)
+        futures = [self._executor.submit(shard.search, query, k, filters) for shard in self.shards]
+        hits = [hit for future in futures for hit in future.result()]
+        merged = nsmallest(k, hits, key=lambda hit: hit.score)
+        with self._latency_lock:
+            self.latency.add(time.perf_counter() - start)
+        return merged
+
+    def stats(self) -> Dict:
+        return {
+            'num_shards': len(self.shards),
+            'total_vectors': self.manifest['total'],
+            'search': self.latency.summary(),
+            'shards': [
+                {'shard': shard.number, 'vectors': self.manifest['shards'][shard.number]['count'],
+                 'search_time': shard.search_time.summary(), 'round_trip': shard.round_trip.summary()}
+                for shard in self.shards
+            ],
+        }
+
+    def close(self):
+        """Stop the shard workers once their in-flight searches finish"""
+        self.closed = True
+        for shard in self.shards:
+            with shard.lock:
+                try:
+                    shard.conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+                shard.conn.close()
+            shard.process.join(timeout=5)
+            if shard.process.is_alive():
+                shard.process.terminate()
+        self._executor.shutdown(wait=False)
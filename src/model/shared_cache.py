@@ -0,0 +1,277 @@
+"""
+Two-level cache for query embeddings, retrieval results and answers.
+
+Each process keeps a small LRU (level 1) in front of a backend shared by all
+uvicorn workers and replicas (level 2):
+
+- RedisBackend: any Redis-protocol server (optional ``redis`` package)
+- SQLiteBackend: a file shared by the workers of one host
+- MemoryBackend: in-process stand-in with the same semantics, for tests
+
+Values are compact bytes: vectors as raw float32, retrieval results as int32
+index positions, answers as JSON. Every entry has a TTL. Backend errors are
+counted and treated as misses so the cache never fails a request.
+
+Enable with CACHE_BACKEND=redis|sqlite|memory (CACHE_URL for Redis,
+CACHE_SQLITE_PATH for SQLite); caching is off when it is unset.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KEY_VERSION = "rag1"
+
+
+def encode_vector(vector) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.float32)
+
+
+def encode_positions(positions: Sequence[int]) -> bytes:
+    return np.asarray(positions, dtype=np.int32).tobytes()
+
+
+def decode_positions(data: bytes) -> List[int]:
+    return np.frombuffer(data, dtype=np.int32).tolist()
+
+
+class MemoryBackend:
+    """Dict with expiry; behaves like the Redis backend for GET/SET EX"""
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("CACHE_BACKEND=redis requires the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+
+class SQLiteBackend:
+    """Shared by worker processes on one host; one connection per thread"""
+
+    def __init__(self, path: str = ".cache/shared_cache.sqlite", purge_interval: float = 300):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = time.time()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                     (key, value, now + ttl))
+        if now - self._last_purge > self.purge_interval:
+            self._last_purge = now
+            conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+        conn.commit()
+
+
+class TieredCache:
+    """Local LRU (level 1) in front of a shared backend (level 2)"""
+
+    def __init__(self, shared=None, local_size: int = 2048, local_ttl: float = 60):
+        self.shared = shared
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'errors': 0}
+
+    def _local_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.time():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return value
+
+    def _local_set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            # Short local TTL bounds staleness versus the shared tier
+            self._local[key] = (value, time.time() + min(ttl, self.local_ttl))
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._local_get(key)
+        if value is not None:
+            self.counters['local_hits'] += 1
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                self.counters['errors'] += 1
+                logger.warning(f"Shared cache get failed: {e}")
+                value = None
+            if value is not None:
+                self.counters['shared_hits'] += 1
+                self._local_set(key, value, self.local_ttl)
+                return value
+        self.counters['misses'] += 1
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self._local_set(key, value, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, ttl)
+            except Exception as e:
+                self.counters['errors'] += 1
+                logger.warning(f"Shared cache set failed: {e}")
+
+    def stats(self) -> Dict:
+        lookups = self.counters['local_hits'] + self.counters['shared_hits'] + self.counters['misses']
+        hits = lookups - self.counters['misses']
+        return {
+            'backend': type(self.shared).__name__ if self.shared is not None else None,
+            'local_entries': len(self._local),
+            'hit_rate': hits / lookups if lookups else 0.0,
+            **self.counters,
+        }
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class RAGCache:
+    """Typed keys and TTLs for the values GeminiRAGSystem caches"""
+
+    def __init__(self, cache: TieredCache, embedding_ttl: float = 7 * 86400,
+                 retrieval_ttl: float = 86400, answer_ttl: float = 3600):
+        self.cache = cache
+        self.embedding_ttl = embedding_ttl
+        self.retrieval_ttl = retrieval_ttl
+        self.answer_ttl = answer_ttl
+
+    @classmethod
+    def from_env(cls) -> Optional["RAGCache"]:
+        backend = os.getenv('CACHE_BACKEND', '').lower()
+        if backend in ('', 'none', 'off'):
+            return None
+        if backend == 'redis':
+            shared = RedisBackend(os.getenv('CACHE_URL', 'redis://localhost:6379/0'))
+        elif backend == 'sqlite':
+            shared = SQLiteBackend(os.getenv('CACHE_SQLITE_PATH', '.cache/shared_cache.sqlite'))
+        elif backend == 'memory':
+            shared = MemoryBackend()
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND '{backend}'")
+        logger.info(f"🗄️ Using {type(shared).__name__} for the shared cache")
+        return cls(
+            TieredCache(shared, local_size=int(os.getenv('CACHE_LOCAL_SIZE', '2048')),
+                        local_ttl=float(os.getenv('CACHE_LOCAL_TTL', '60'))),
+            embedding_ttl=float(os.getenv('CACHE_TTL_EMBEDDING', str(7 * 86400))),
+            retrieval_ttl=float(os.getenv('CACHE_TTL_RETRIEVAL', '86400')),
+            answer_ttl=float(os.getenv('CACHE_TTL_ANSWER', '3600')),
+        )
+
+    def get_embedding(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        data = self.cache.get(f"{KEY_VERSION}:emb:{_digest(model_name, text)}")
+        return decode_vector(data) if data is not None else None
+
+    def put_embedding(self, model_name: str, text: str, vector):
+        self.cache.set(f"{KEY_VERSION}:emb:{_digest(model_name, text)}",
+                       encode_vector(vector), self.embedding_ttl)
+
+    def get_retrieval(self, index_version: str, question: str, k: int, filters=None) -> Optional[List[int]]:
+        data = self.cache.get(f"{KEY_VERSION}:ret:{index_version}:{_digest(question, k, filters)}")
+        return decode_positions(data) if data is not None else None
+
+    def put_retrieval(self, index_version: str, question: str, k: int, filters, positions: Sequence[int]):
+        self.cache.set(f"{KEY_VERSION}:ret:{index_version}:{_digest(question, k, filters)}",
+                       encode_positions(positions), self.retrieval_ttl)
+
+    def get_answer(self, index_version: str, question: str, filters=None) -> Optional[Dict]:
+        data = self.cache.get(f"{KEY_VERSION}:ans:{index_version}:{_digest(question, filters)}")
+        return json.loads(data) if data is not None else None
+
+    def put_answer(self, index_version: str, question: str, filters, result: Dict):
+        value = {key: result[key] for key in ('answer', 'sources_count', 'prompt_chars') if key in result}
+        self.cache.set(f"{KEY_VERSION}:ans:{index_version}:{_digest(question, filters)}",
+                       json.dumps(value).encode(), self.answer_ttl)
+
+    def stats(self) -> Dict:
+        return self.cache.stats()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[RAGCache]:
+    """Process-wide cache from the environment, shared by every loaded index"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = RAGCache.from_env() or False
+        return _default_cache or None
@@ -0,0 +1,69 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait for the leader's result instead of
+    repeating the work. Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.collapsed = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per in-flight key; returns (result, shared) where shared marks followers"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.collapsed += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        total = self.leaders + self.collapsed
+        return {
+            'upstream_calls': self.leaders,
+            'collapsed_calls': self.collapsed,
+            'collapse_rate': self.collapsed / total if total else 0.0,
+            'in_flight_keys': in_flight,
+        }
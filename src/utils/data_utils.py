@@ -1,26 +1,215 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+
+HASH_BUCKETS = 10000
+
+# (prefix, separator, suffix) around the input and response text
+TEMPLATES = {
+    "llama": ("<|start_header_id|>user<|end_header_id|>\n\n",
+              "<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n",
+              "<|eot_id|>"),
+    "deepseek": ("Human: ", "\nAssistant: ", ""),
+    "mixtral": ("<s>[INST] ", " [/INST] ", "</s>"),
+}
+DEFAULT_TEMPLATE = ("Human: ", "\nAssistant: ", "")
+
+
+def hash_split_mask(df, test_size=0.1, columns=("input", "response"), salt=""):
+    """True for validation rows, decided per row by a hash of its content.
+
+    The assignment depends only on the row itself, so it is stable as the
+    dataset grows and can be computed chunk by chunk without shuffling.
+    Missing values hash like empty strings, however the CSV was parsed.
+    """
+    hashed = pd.util.hash_pandas_object(df[list(columns)].fillna('').astype(str), index=False,
+                                        hash_key=(salt + "0123456789123456")[:16])
+    return (hashed.values % HASH_BUCKETS) < int(test_size * HASH_BUCKETS)
+
 
 def prepare_chat_data(df, test_size=0.1):
     """Split data into train/validation sets"""
-    train_df, val_df = train_test_split(
-        df, 
-        test_size=test_size, 
-        random_state=42,
-        shuffle=True
-    )
-    
+    is_val = hash_split_mask(df, test_size)
+    train_df, val_df = df[~is_val], df[is_val]
+
     # Save splits
+    os.makedirs('data/splits', exist_ok=True)
     train_df.to_csv('data/splits/train.csv', index=False)
     val_df.to_csv('data/splits/validation.csv', index=False)
-    
+
     return train_df, val_df
 
+
+def read_csv_text(input_csv, **kwargs):
+    """Read a CSV as raw text (no NaN conversion), as every hash-split path does"""
+    return pd.read_csv(input_csv, dtype=str, keep_default_na=False, **kwargs)
+
+
+def stream_split(input_csv, output_dir='data/splits', test_size=0.1, chunksize=200000):
+    """Hash-split a CSV of any size into train.csv/validation.csv chunk by chunk"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {split: os.path.join(output_dir, f"{split}.csv") for split in ("train", "validation")}
+    counts = {"train": 0, "validation": 0}
+    for i, chunk in enumerate(read_csv_text(input_csv, chunksize=chunksize)):
+        is_val = hash_split_mask(chunk, test_size)
+        for split, part in (("train", chunk[~is_val]), ("validation", chunk[is_val])):
+            part.to_csv(paths[split], mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            counts[split] += len(part)
+    return counts
+
+
 def format_conversation_template(input_text, response_text, template_type="llama"):
     """Format conversations based on model requirements"""
-    templates = {
-        "llama": f"<|start_header_id|>user<|end_header_id|>\n\n{input_text}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n{response_text}<|eot_id|>",
-        "deepseek": f"Human: {input_text}\nAssistant: {response_text}",
-        "mixtral": f"<s>[INST] {input_text} [/INST] {response_text}</s>"
+    prefix, separator, suffix = TEMPLATES.get(template_type, DEFAULT_TEMPLATE)
+    return f"{prefix}{input_text}{separator}{response_text}{suffix}"
+
+
+def format_conversations(inputs, responses, template_type="llama"):
+    """Vectorized format_conversation_template over two Series"""
+    prefix, separator, suffix = TEMPLATES.get(template_type, DEFAULT_TEMPLATE)
+    return prefix + inputs.astype(str) + separator + responses.astype(str) + suffix
+
+
+def _write_shard(chunk, path, template_type, fmt):
+    """Template one chunk and write it as a shard; returns (rows, bytes written)"""
+    texts = format_conversations(chunk['input'], chunk['response'], template_type)
+    if fmt == 'arrow':
+        import pyarrow as pa
+        table = pa.table({'text': texts.tolist()})
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        # Fast compression level: level 9 costs ~4x the time for a few % smaller shards
+        pd.DataFrame({'text': texts}).to_json(path, orient='records', lines=True, force_ascii=False,
+                                              compression={'method': 'gzip', 'compresslevel': 1})
+    return len(texts), os.path.getsize(path)
+
+
+def _shard_job(args):
+    chunk, test_size, output_dir, index, template_type, fmt = args
+    is_val = hash_split_mask(chunk, test_size)
+    extension = 'arrow' if fmt == 'arrow' else 'jsonl.gz'
+    written = {}
+    for split, part in (("train", chunk[~is_val]), ("validation", chunk[is_val])):
+        if len(part):
+            path = os.path.join(output_dir, f"{split}-{index:05d}.{extension}")
+            written[split] = (os.path.basename(path),) + _write_shard(part, path, template_type, fmt)
+    return written
+
+
+def export_training_shards(input_csv, output_dir='data/shards', template_type="llama",
+                           fmt='jsonl.gz', test_size=0.1, rows_per_shard=500000,
+                           workers: Optional[int] = None) -> Dict:
+    """Stream a CSV into hash-split, templated training shards written in parallel.
+
+    The CSV is read one shard-sized chunk at a time; splitting, templating,
+    serialization and compression run in worker processes, with at most two
+    chunks per worker in flight to bound memory.
+    """
+    if fmt not in ('jsonl.gz', 'arrow'):
+        raise ValueError("fmt must be 'jsonl.gz' or 'arrow'")
+    if fmt == 'arrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Arrow export requires pyarrow (pip install pyarrow)")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    shards = {"train": [], "validation": []}
+    start = time.perf_counter()
+    input_bytes = os.path.getsize(input_csv)
+
+    def jobs() -> Iterable:
+        reader = read_csv_text(input_csv, chunksize=rows_per_shard, usecols=['input', 'response'])
+        for index, chunk in enumerate(reader):
+            yield chunk, test_size, output_dir, index, template_type, fmt
+
+    if workers == 1:
+        for job in jobs():
+            _collect(_shard_job(job), shards)
+    else:
+        _run_parallel(jobs(), workers, shards)
+
+    elapsed = time.perf_counter() - start
+    rows = sum(s['rows'] for split in shards.values() for s in split)
+    output_bytes = sum(s['bytes'] for split in shards.values() for s in split)
+    manifest = {
+        'source': input_csv,
+        'template': template_type,
+        'format': fmt,
+        'test_size': test_size,
+        'rows': rows,
+        'rows_by_split': {split: sum(s['rows'] for s in items) for split, items in shards.items()},
+        'shards': shards,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed else 0.0,
+        'input_mb_per_second': input_bytes / 1024 / 1024 / elapsed if elapsed else 0.0,
+        'output_bytes': output_bytes,
     }
-    return templates.get(template_type, f"Human: {input_text}\nAssistant: {response_text}")
\ No newline at end of file
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _run_parallel(jobs, workers, shards):
+    with ProcessPoolExecutor(workers) as executor:
+        pending = []
+        for job in jobs:
+            pending.append(executor.submit(_shard_job, job))
+            if len(pending) >= 2 * workers:
+                _collect(pending.pop(0).result(), shards)
+        for future in pending:
+            _collect(future.result(), shards)
+
+
+def _collect(written, shards):
+    for split, (name, rows, size) in written.items():
+        shards[split].append({'file': name, 'rows': rows, 'bytes': size})
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    """Persona-Chat-like input/response pairs for throughput benchmarks"""
+    rng = np.random.default_rng(seed)
+    words = np.array("i love my dog we go hiking every weekend what do you like to do for fun "
+                     "work as a teacher in the city have two kids enjoy cooking music".split())
+    with open(path, 'w') as f:
+        f.write("input,response\n")
+        for start in range(0, rows, 100000):
+            n = min(100000, rows - start)
+            inputs = [" ".join(rng.choice(words, rng.integers(3, 15))) for _ in range(n)]
+            responses = [" ".join(rng.choice(words, rng.integers(3, 25))) for _ in range(n)]
+            f.write("".join(f"{a},{b}\n" for a, b in zip(inputs, responses)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export hash-split, templated training shards")
+    parser.add_argument("--input", default="data/processed/cleaned_conversations.csv")
+    parser.add_argument("--output", default="data/shards")
+    parser.add_argument("--template", choices=sorted(TEMPLATES), default="llama")
+    parser.add_argument("--format", choices=["jsonl.gz", "arrow"], default="jsonl.gz")
+    parser.add_argument("--test-size", type=float, default=0.1)
+    parser.add_argument("--rows-per-shard", type=int, default=500000)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--benchmark-rows", type=int,
+                        help="Generate a synthetic CSV with this many rows and export it instead of --input")
+    args = parser.parse_args()
+
+    input_csv = args.input
+    if args.benchmark_rows:
+        input_csv = os.path.join(args.output, "synthetic.csv")
+        os.makedirs(args.output, exist_ok=True)
+        print(f"🧪 Writing {args.benchmark_rows} synthetic rows to {input_csv}...")
+        write_synthetic_csv(input_csv, args.benchmark_rows)
+
+    manifest = export_training_shards(input_csv, args.output, args.template, args.format,
+                                      args.test_size, args.rows_per_shard, args.workers)
+    print(f"✅ {manifest['rows']} rows -> {sum(len(s) for s in manifest['shards'].values())} shards "
+          f"in {manifest['seconds']:.1f}s ({manifest['rows_per_second']:,.0f} rows/s, "
+          f"{manifest['input_mb_per_second']:.1f} MB/s read)")
+    print(f"📊 train {manifest['rows_by_split']['train']}, validation {manifest['rows_by_split']['validation']}")
@@ -0,0 +1,50 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\s+', ' ', str(text).lower()).strip()
+
+
+def is_relevant(doc_text: str, expected_response: str) -> bool:
+    """A retrieved document counts as relevant if it contains the expected response.
+
+    Documents are built as "Question: <input>\\nAnswer: <response>", so a hit
+    means retrieval surfaced the conversation pair the answer comes from.
+    """
+    expected = _normalize(expected_response)
+    return bool(expected) and expected in _normalize(doc_text)
+
+
+def first_relevant_rank(doc_texts: Sequence[str], expected_response: str) -> Optional[int]:
+    """1-based rank of the first relevant document, or None"""
+    for rank, text in enumerate(doc_texts, 1):
+        if is_relevant(text, expected_response):
+            return rank
+    return None
+
+
+def retrieval_scores(ranks: Iterable[Optional[int]], ks: Sequence[int] = (1, 3, 5)) -> Dict:
+    """recall@k and MRR from first-relevant ranks (one expected document per question)"""
+    ranks = list(ranks)
+    total = len(ranks)
+    if not total:
+        return {}
+    scores = {f"recall@{k}": sum(1 for r in ranks if r is not None and r <= k) / total for k in ks}
+    scores['mrr'] = sum(1.0 / r for r in ranks if r is not None) / total
+    return scores
+
+
+def latency_percentiles(values: List[float]) -> Dict:
+    """p50/p95/p99 and mean of a list of latencies (seconds)"""
+    if not values:
+        return {}
+    arr = np.asarray(values, dtype=float)
+    return {
+        'mean': float(arr.mean()),
+        'p50': float(np.percentile(arr, 50)),
+        'p95': float(np.percentile(arr, 95)),
+        'p99': float(np.percentile(arr, 99)),
+    }
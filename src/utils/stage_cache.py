@@ -0,0 +1,156 @@
+"""
+Content-addressed caching for pipeline stages.
+
+Stage outputs are keyed on a hash of their input content plus the parameters
+that affect the result, so re-running a pipeline only recomputes the stages
+whose inputs or settings actually changed.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.getenv("PIPELINE_CACHE_DIR", ".cache/pipeline")
+
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 hex digest of raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """SHA-256 hex digest of a string"""
+    return hash_bytes(text.encode("utf-8"))
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of a file's content, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_params(params: Dict) -> str:
+    """Stable hash of a JSON-serializable parameter dict"""
+    return hash_text(json.dumps(params, sort_keys=True, default=str))
+
+
+class StageCache:
+    """Pickle-backed store of stage outputs keyed by input hash + parameters"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir) / "stages"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, stage: str, input_hash: str, params: Optional[Dict] = None) -> str:
+        """Cache key for one stage run"""
+        return hash_params({"stage": stage, "input": input_hash, "params": params or {}})
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.cache_dir / f"{stage}-{key[:32]}.pkl"
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        """Return the cached output or None"""
+        path = self._path(stage, key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            # Corrupt or partially written entry - treat as a miss
+            return None
+
+    def put(self, stage: str, key: str, value: Any):
+        """Store a stage output atomically"""
+        path = self._path(stage, key)
+        # Unique per writer, so concurrent puts of the same key never share a temp file
+        tmp_path = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def run(self, stage: str, input_hash: str, params: Optional[Dict],
+            compute: Callable[[], Any]) -> Any:
+        """Return the cached output of a stage, computing and storing it on a miss"""
+        key = self.key(stage, input_hash, params)
+        cached = self.get(stage, key)
+        if cached is not None:
+            print(f"♻️ Stage '{stage}' is up to date, using cache")
+            return cached
+        value = compute()
+        self.put(stage, key, value)
+        return value
+
+
+class EmbeddingCache:
+    """Per-chunk embedding cache stored in SQLite, keyed by model name + text hash"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.db_path = str(Path(cache_dir) / "embeddings.sqlite")
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+
+    def get_many(self, model_name: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Look up cached vectors for the given text hashes"""
+        found = {}
+        with sqlite3.connect(self.db_path) as conn:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = list(hashes[start:start + 500])
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model_name, *batch],
+                )
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model_name: str, items: Dict[str, np.ndarray]):
+        """Store vectors keyed by text hash"""
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model_name, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items.items()],
+            )
+
+    def embed_documents(self, texts: List[str], embeddings, model_name: str,
+                        batch_size: int = 256) -> List[List[float]]:
+        """Embed texts, only calling the model for texts not already cached"""
+        hashes = [hash_text(t) for t in texts]
+        cached = self.get_many(model_name, list(dict.fromkeys(hashes)))
+
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+
+        if missing:
+            print(f"🧮 Embedding {len(missing)} new chunks ({len(cached)} cached)")
+            missing_items = list(missing.items())
+            for start in range(0, len(missing_items), batch_size):
+                batch = missing_items[start:start + batch_size]
+                vectors = embeddings.embed_documents([text for _, text in batch])
+                new_vectors = {h: np.asarray(v, dtype=np.float32) for (h, _), v in zip(batch, vectors)}
+                self.put_many(model_name, new_vectors)
+                cached.update(new_vectors)
+        else:
+            print(f"♻️ All {len(texts)} chunk embeddings served from cache")
+
+        return [cached[h].tolist() for h in hashes]
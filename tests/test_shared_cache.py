@@ -0,0 +1,63 @@
+import time
+
+from src.model.shared_cache import MemoryBackend, RAGCache, TieredCache
+
+
+class FailingBackend:
+    def get(self, key):
+        raise ConnectionError("backend down")
+
+    def set(self, key, value, ttl):
+        raise ConnectionError("backend down")
+
+
+def test_memory_backend_expires_entries(monkeypatch):
+    backend = MemoryBackend()
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now)
+    backend.set('key', b'value', ttl=10)
+    assert backend.get('key') == b'value'
+
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert backend.get('key') is None
+
+
+def test_local_tier_evicts_least_recently_used():
+    cache = TieredCache(shared=None, local_size=2)
+    cache.set('a', b'1', ttl=60)
+    cache.set('b', b'2', ttl=60)
+    assert cache.get('a') == b'1'  # 'b' is now the least recently used
+    cache.set('c', b'3', ttl=60)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1'
+    assert cache.get('c') == b'3'
+
+
+def test_shared_tier_serves_after_local_expiry(monkeypatch):
+    cache = TieredCache(shared=MemoryBackend(), local_ttl=1)
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now)
+    cache.set('key', b'value', ttl=60)
+
+    monkeypatch.setattr(time, 'time', lambda: now + 2)
+    assert cache.get('key') == b'value'
+    assert cache.counters['shared_hits'] == 1
+
+
+def test_backend_errors_count_as_misses():
+    cache = TieredCache(shared=FailingBackend(), local_size=0)
+    cache.set('key', b'value', ttl=60)
+
+    assert cache.get('key') is None
+    assert cache.counters['errors'] == 2
+    assert cache.counters['misses'] == 1
+
+
+def test_answer_key_includes_settings():
+    cache = RAGCache(TieredCache(shared=MemoryBackend()))
+    cache.put_answer('v1', 'what is ml', ('', 0.5), {'answer': 'old', 'sources_count': 1})
+
+    assert cache.get_answer('v1', 'what is ml', ('', 0.5))['answer'] == 'old'
+    assert cache.get_answer('v1', 'what is ml', ('', 0.7)) is None
+    assert cache.get_answer('v2', 'what is ml', ('', 0.5)) is None